@@ -0,0 +1,85 @@
+"""
+Micro-benchmark for LanguageManager.get_text.
+
+Compares the legacy lookup (split the key, walk the nested YAML dicts,
+str.format, repeat the walk against English on a miss) with the compiled
+catalogs on a mix of plain, formatted, fallback and missing keys.
+
+Usage: python benchmarks/bench_language.py [call_count]
+"""
+import os
+import sys
+import time
+
+import yaml
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.catalog import Template
+from utils.language import LanguageManager
+
+LANG_DIR = os.path.join(ROOT, 'languages')
+
+# (key, kwargs) by lookup shape
+SCENARIOS = {
+    'plain': [("help.title", {}), ("commands.ping.description", {}), ("lang.available", {})],
+    'formatted': [
+        ("help.usage_note", {'prefix': '!'}),
+        ("bot.command_timeout", {'command': 'sysinfo', 'timeout': 30}),
+        ("help.not_found", {'command': 'nope'}),
+    ],
+    'fallback': [("only.in.english", {})],
+    'missing': [("no.such.key", {})],
+}
+
+def load_raw():
+    languages = {}
+    for filename in os.listdir(LANG_DIR):
+        if filename.endswith('.yml'):
+            with open(os.path.join(LANG_DIR, filename), 'r', encoding='utf-8') as f:
+                languages[filename[:-4]] = yaml.safe_load(f)
+    languages['en'].setdefault('only', {}).setdefault('in', {})['english'] = "English only"
+    return languages
+
+def legacy_get_text(languages, lang_code, key, **kwargs):
+    """get_text as implemented before the compiled catalogs."""
+    try:
+        parts = key.split('.')
+        text = languages[lang_code]
+        for part in parts:
+            text = text[part]
+        return text.format(**kwargs)
+    except (KeyError, AttributeError):
+        try:
+            text = languages['en']
+            for part in parts:
+                text = text[part]
+            return text.format(**kwargs)
+        except (KeyError, AttributeError):
+            return f"Missing text: {key}"
+
+def run(get_text, calls, count):
+    start = time.perf_counter()
+    for _ in range(count // len(calls)):
+        for key, kwargs in calls:
+            get_text('tr', key, **kwargs)
+    return time.perf_counter() - start
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    languages = load_raw()
+    manager = LanguageManager(LANG_DIR)
+    manager.catalogs['en']['only.in.english'] = Template("English only")
+    manager._resolved.clear()
+
+    for name, calls in SCENARIOS.items():
+        for key, kwargs in calls:
+            assert legacy_get_text(languages, 'tr', key, **kwargs) == manager.get_text_for('tr', key, **kwargs), key
+        legacy = run(lambda *a, **k: legacy_get_text(languages, *a, **k), calls, count)
+        compiled = run(manager.get_text_for, calls, count)
+        print(f"{name:10} legacy {count / legacy / 1e6:6.2f}M/s  compiled {count / compiled / 1e6:6.2f}M/s  "
+              f"speedup {legacy / compiled:.2f}x")
+
+if __name__ == '__main__':
+    main()
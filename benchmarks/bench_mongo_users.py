@@ -0,0 +1,90 @@
+"""
+Benchmark for the User model's MongoDB access.
+
+Compares the legacy pattern (a new MongoClient per call, closed afterwards)
+with UserRepository on the shared, pooled client of web.app.mongo, for
+get_by_telegram_id and update_last_login.
+
+Runs against a local mongod when MONGO_URI is set, otherwise against a
+mongomock stand-in (which leaves out the TCP handshake and server discovery
+a real per-call client pays, so the gap there is a lower bound).
+
+Usage: MONGO_URI=mongodb://localhost:27017/ python benchmarks/bench_mongo_users.py [call_count]
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+MONGO_URI = os.getenv('MONGO_URI')
+DB_NAME = 'userbot_bench'
+
+if MONGO_URI:
+    from pymongo import MongoClient
+    STAND_IN = False
+else:
+    import mongomock
+    from mongomock.store import ServerStore
+    MONGO_URI = 'mongodb://localhost:27017/'
+    STAND_IN = True
+    _store = ServerStore()
+
+    def MongoClient(*args, **kwargs):
+        # Every mongomock client gets its own data unless they share a store
+        return mongomock.MongoClient(*args, _store=_store)
+
+from web.app import mongo, mongo_client_options
+from web.models.user import User
+
+USER_COUNT = 200
+
+def legacy_get(telegram_id):
+    client = MongoClient(MONGO_URI)
+    user_data = client[DB_NAME].users.find_one({'telegram_id': str(telegram_id)})
+    client.close()
+    return User(user_data) if user_data else None
+
+def legacy_touch(telegram_id):
+    client = MongoClient(MONGO_URI)
+    client[DB_NAME].users.update_one({'telegram_id': telegram_id}, {'$set': {'last_login': datetime.utcnow()}})
+    client.close()
+
+def pooled_get(telegram_id):
+    return User.get_by_telegram_id(telegram_id)
+
+def pooled_touch(telegram_id):
+    User({'telegram_id': telegram_id}).update_last_login()
+
+def timed(func, calls):
+    start = time.perf_counter()
+    for i in range(calls):
+        func(str(i % USER_COUNT))
+    return (time.perf_counter() - start) / calls * 1e6
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+
+    mongo.cx = MongoClient(MONGO_URI, **mongo_client_options())
+    mongo.db = mongo.cx[DB_NAME]
+    mongo.db.users.drop()
+    mongo.db.users.insert_many([
+        {'telegram_id': str(i), 'username': f"user_{i}", 'is_active': True} for i in range(USER_COUNT)
+    ])
+
+    print(f"{calls} calls per case against {'mongomock' if STAND_IN else MONGO_URI}")
+    print(f"{'case':<22}{'legacy us/call':>16}{'pooled us/call':>16}{'speedup':>10}")
+    for name, legacy, pooled in (
+        ('get_by_telegram_id', legacy_get, pooled_get),
+        ('update_last_login', legacy_touch, pooled_touch),
+    ):
+        old = timed(legacy, calls)
+        new = timed(pooled, calls)
+        print(f"{name:<22}{old:>16.1f}{new:>16.1f}{old / new:>9.1f}x")
+
+    mongo.db.users.drop()
+    mongo.cx.close()
+
+if __name__ == '__main__':
+    main()
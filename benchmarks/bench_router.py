@@ -0,0 +1,168 @@
+"""
+Benchmark for the command_handler hot path.
+
+Feeds stub events to the real UserBot.command_handler (router, metrics,
+scheduler lanes and execute_command, built with `main(start=False)`) and
+compares it with the legacy handler it replaced: a triple split, a dict
+probe and the command awaited inline. Both run the same no-op commands,
+installed in a temporary commands directory, and the 'after' timing
+includes draining the scheduler, so it covers every queued command.
+
+The new handler does far more per command than the legacy one (the
+chat's lane, a timeout, the stall monitor, metrics, the reply language
+and the response cache), so command streams are much slower; plain chat
+text only pays for the prefix check and the message counter. The legacy parser does
+not understand quotes, so the 'quoted' scenario compares a correct
+tokenizer against an incorrect one.
+
+Needs telethon installed; logging is set to ERROR so both sides skip it.
+
+Usage: python benchmarks/bench_router.py [message_count]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from telethon.crypto import AuthKey
+from telethon.sessions import StringSession
+
+PREFIX = '!'
+COMMAND_NAMES = ['help', 'cmd', 'ping', 'echo', 'sysinfo', 'lang'] + [f'plugin_{i}' for i in range(100)]
+
+# Message streams by traffic shape; group chats are mostly non-command text
+SCENARIOS = {
+    'chat': [
+        "hello everyone, how is it going?",
+        "lol",
+        "did anyone see the match yesterday",
+        "https://example.com/some/long/link?with=params",
+        "ok",
+    ],
+    'commands': [
+        "!ping",
+        "!echo hello world",
+        "!help sysinfo",
+        "!unknown_command arg",
+        "!plugin_42 a b c",
+    ],
+    'quoted': [
+        '!echo "quoted argument" and more',
+        "!plugin_7 'two words' three",
+    ],
+}
+SCENARIOS['mixed'] = SCENARIOS['chat'] * 3 + SCENARIOS['commands'] + SCENARIOS['quoted'][:1]
+
+COMMAND_SOURCE = "async def command(event, args):\n    return None\n"
+
+class StubMessage:
+    __slots__ = ('text', 'id', 'is_reply')
+
+    def __init__(self, text):
+        self.text = text
+        self.id = 1
+        self.is_reply = False
+
+class StubEvent:
+    """The parts of a NewMessage event the handler and execute_command touch."""
+    __slots__ = ('message', 'chat_id', 'sender_id', 'out', 'is_private')
+
+    def __init__(self, text, chat_id=1):
+        self.message = StubMessage(text)
+        self.chat_id = chat_id
+        self.sender_id = 42
+        self.out = False
+        self.is_private = False
+
+    async def reply(self, text):
+        return None
+
+def session_string():
+    """A well-formed session that is never connected."""
+    session = StringSession()
+    session.set_dc(2, '149.154.167.51', 443)
+    session.auth_key = AuthKey(bytes(256))
+    return session.save()
+
+def configure(work_dir, count):
+    commands_dir = os.path.join(work_dir, 'commands')
+    os.makedirs(commands_dir)
+    for name in COMMAND_NAMES:
+        with open(os.path.join(commands_dir, name + '.py'), 'w', encoding='utf-8') as f:
+            f.write(COMMAND_SOURCE)
+    os.environ.update({
+        'API_ID': '1',
+        'API_HASH': '0' * 32,
+        'SESSION_STRING': session_string(),
+        'COMMAND_PREFIX': PREFIX,
+        'COMMANDS_DIR': commands_dir,
+        'PLUGIN_STORE': os.path.join(work_dir, 'plugin_store'),
+        'LOCALE_DB': os.path.join(work_dir, 'locales.db'),
+        'LOG_LEVEL': 'ERROR',
+        # One chat, so every command of a run has to fit in its lane
+        'MAX_QUEUED_PER_CHAT': str(count + 1),
+    })
+
+def make_legacy_handler():
+    async def _noop(event, args):
+        return None
+
+    commands = {name: _noop for name in COMMAND_NAMES}
+
+    async def legacy_handler(event):
+        """command_handler before the router."""
+        if event.message.text and event.message.text.startswith(PREFIX):
+            command_text = event.message.text[len(PREFIX):]
+            command_name = command_text.split()[0].lower()
+            args = command_text.split()[1:] if len(command_text.split()) > 1 else []
+            if command_name in commands:
+                result = await commands[command_name](event, args)
+                if isinstance(result, dict):
+                    await event.reply(result.get('return', ''))
+
+    return legacy_handler
+
+async def measure(handler, events, scheduler=None):
+    start = time.perf_counter()
+    for event in events:
+        await handler(event)
+    if scheduler is not None:
+        while scheduler.depth or scheduler.stats.running:
+            await asyncio.sleep(0)
+    return time.perf_counter() - start
+
+async def run(count):
+    import bot as bot_module
+
+    bot = bot_module.main(start=False)
+    handlers = (('before', make_legacy_handler(), None), ('after', bot.command_handler, bot.scheduler))
+    try:
+        for scenario, stream in SCENARIOS.items():
+            events = [StubEvent(text) for text in (stream * (count // len(stream) + 1))[:count]]
+            results = {}
+            for label, handler, scheduler in handlers:
+                # Best of three runs
+                elapsed = min([await measure(handler, events, scheduler) for _ in range(3)])
+                results[label] = count / elapsed
+            print(f"{scenario:>8}: before {results['before']:>12,.0f} msg/s | "
+                  f"after {results['after']:>12,.0f} msg/s | "
+                  f"{results['after'] / results['before']:.2f}x")
+    finally:
+        bot.offloader.shutdown()
+        bot.locales.close()
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    with tempfile.TemporaryDirectory() as work_dir:
+        # bot.log is written to the working directory, language files are looked up there
+        os.symlink(os.path.join(ROOT, 'languages'), os.path.join(work_dir, 'languages'))
+        os.chdir(work_dir)
+        configure(work_dir, count)
+        asyncio.run(run(count))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,116 @@
+"""
+Benchmark for utils.security on large synthetic plugin files.
+
+Compares the legacy SecurityChecker (two AST walks plus six regex scans)
+with the single-pass checker, cold and memoized, and times a directory
+scan serially and with scan_directory's process pool.
+
+Usage: python benchmarks/bench_security.py [file_count] [functions_per_file]
+"""
+import ast
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import security
+from utils.security import SecurityChecker, scan_directory
+
+class LegacyChecker:
+    """SecurityChecker before the single-pass rewrite (minus the relative import crash)."""
+
+    def __init__(self, code):
+        self.code = code
+        self.warnings = []
+
+    def check_code(self):
+        try:
+            tree = ast.parse(self.code)
+        except SyntaxError:
+            return False, ["❌ Code contains syntax errors"]
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for name in node.names:
+                    if any(name.name.startswith(imp) for imp in SecurityChecker.DANGEROUS_IMPORTS):
+                        self.warnings.append(f"⚠️ Dangerous import: {name.name}")
+            elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                if any(node.module.startswith(imp) for imp in SecurityChecker.DANGEROUS_IMPORTS):
+                    self.warnings.append(f"⚠️ Dangerous import: {node.module}")
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Call):
+                if isinstance(node.func, ast.Name):
+                    if node.func.id in SecurityChecker.DANGEROUS_FUNCTIONS:
+                        self.warnings.append(f"⚠️ Dangerous function call: {node.func.id}()")
+                elif isinstance(node.func, ast.Attribute):
+                    if node.func.attr in SecurityChecker.DANGEROUS_FUNCTIONS:
+                        self.warnings.append(f"⚠️ Dangerous method call: {node.func.attr}()")
+        for pattern, warning in [
+            (r'subprocess\.', "subprocess usage"), (r'os\.system', "system command execution"),
+            (r'__[a-zA-Z]+__', "magic method usage"), (r'lambda', "lambda function"),
+            (r'globals\(\)', "globals() access"), (r'locals\(\)', "locals() access"),
+        ]:
+            if re.search(pattern, self.code):
+                self.warnings.append(f"⚠️ Suspicious pattern: {warning}")
+        return len(self.warnings) == 0, self.warnings
+
+SNIPPETS = [
+    "    total = sum(x * {n} for x in range(len(args)))\n",
+    "    text = ' '.join(str(arg).upper() for arg in args if arg)\n",
+    "    data = {{'key_{n}': [i for i in range({n})], 'nested': {{'a': 1}}}}\n",
+    "    result = helper_{n}(event, args[1:]) if args else None\n",
+    "    value = open('file_{n}.txt').read()\n",
+    "    key = sorted(args, key=lambda item: len(item))\n",
+]
+
+def make_plugin(functions, rng):
+    lines = ["from . import shared\n", "import json\n", "import os\n\n"]
+    for n in range(functions):
+        lines.append(f"def helper_{n}(event, args):\n")
+        lines.extend(rng.choice(SNIPPETS).format(n=n) for _ in range(8))
+        lines.append("    return None\n\n")
+    lines.append("async def command(event, args):\n    return {'prefix': 'x', 'return': str(len(args))}\n")
+    return ''.join(lines)
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+def main():
+    file_count = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    functions = int(sys.argv[2]) if len(sys.argv) > 2 else 400
+    rng = random.Random(7)
+    sources = [make_plugin(functions, rng) + f"# {i}\n" for i in range(file_count)]
+    print(f"{file_count} files, {sum(s.count(chr(10)) for s in sources) // file_count} lines each")
+
+    for source in sources[:2]:
+        legacy_safe, legacy_warnings = LegacyChecker(source).check_code()
+        safe, warnings = SecurityChecker(source).check_code()
+        assert (legacy_safe, sorted(legacy_warnings)) == (safe, sorted(warnings))
+    security._results.clear()
+
+    legacy, _ = timed(lambda: [LegacyChecker(s).check_code() for s in sources])
+    cold, _ = timed(lambda: [SecurityChecker(s).check_code() for s in sources])
+    warm, _ = timed(lambda: [SecurityChecker(s).check_code() for s in sources])
+    print(f"legacy   {legacy / file_count * 1000:8.2f} ms/file")
+    print(f"one-pass {cold / file_count * 1000:8.2f} ms/file  ({legacy / cold:.2f}x)")
+    print(f"memoized {warm / file_count * 1000:8.3f} ms/file")
+
+    with tempfile.TemporaryDirectory() as path:
+        for i, source in enumerate(sources):
+            with open(os.path.join(path, f"plugin_{i}.py"), 'w', encoding='utf-8') as f:
+                f.write(source)
+        security._results.clear()
+        serial, _ = timed(lambda: [SecurityChecker(s).check_code() for s in sources])
+        security._results.clear()
+        pooled, results = timed(lambda: scan_directory(path))
+        rescan, _ = timed(lambda: scan_directory(path))
+        assert len(results) == file_count
+        print(f"directory scan: serial {serial:.2f}s, process pool {pooled:.2f}s, rescan {rescan * 1000:.1f} ms")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,55 @@
+"""
+Benchmark for "did you mean" lookups over a large command registry.
+
+Builds a SuggestionIndex over N synthetic plugin names (plus aliases and
+descriptions) and reports the average lookup time for misspelled queries.
+
+Usage: python benchmarks/bench_suggest.py [plugin_count]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.suggest import SuggestionIndex
+
+WORDS = ['sys', 'info', 'ping', 'echo', 'weather', 'translate', 'quote', 'admin', 'ban', 'mute',
+         'stats', 'note', 'remind', 'search', 'image', 'sticker', 'music', 'poll', 'timer', 'dice']
+
+def build_registry(count, rng):
+    names, descriptions = {}, {}
+    for i in range(count):
+        name = f"{rng.choice(WORDS)}{rng.choice(WORDS)}{i}"
+        names[name] = name
+        names[name[:4] + str(i)] = name
+        descriptions[name] = f"Plugin {i} that does {rng.choice(WORDS)} and {rng.choice(WORDS)}"
+    return names, descriptions
+
+def misspell(name, rng):
+    chars = list(name)
+    chars[rng.randrange(len(chars))] = rng.choice('abcdefghijklmnopqrstuvwxyz')
+    return ''.join(chars)
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    rng = random.Random(42)
+    names, descriptions = build_registry(count, rng)
+
+    index = SuggestionIndex()
+    start = time.perf_counter()
+    index.rebuild(names, descriptions)
+    build = time.perf_counter() - start
+
+    queries = [misspell(rng.choice(list(descriptions)), rng) for _ in range(2000)]
+    for search_descriptions in (False, True):
+        start = time.perf_counter()
+        for query in queries:
+            index.suggest(query, search_descriptions)
+        per_lookup = (time.perf_counter() - start) / len(queries)
+        print(f"{count} plugins, descriptions={search_descriptions}: "
+              f"{per_lookup * 1e6:.1f} us/lookup (index build {build * 1000:.1f} ms)")
+
+if __name__ == '__main__':
+    main()
@@ -1,36 +1,46 @@
 import os
 import sys
-import importlib
+import asyncio
+import time
 import traceback
 from telethon import TelegramClient, events
 from telethon.sessions import StringSession
 from dotenv import load_dotenv
 from loguru import logger
-from utils.language import get_lang_manager
-from flask import Flask
-import threading
+from utils.cache import ResponseCache, response_ttl
+from utils.health import HealthServer
+from utils.installer import get_installer
+from utils.help_index import get_help_index
+from utils.language import get_lang_manager, reset_language, use_language
+from utils.locales import get_locale_store
+from utils.log import setup_logging
+from utils.metrics import get_metrics
+from utils.registry import CommandRegistry
+from utils.router import CommandRouter
+from utils.offload import CommandOffloader
+from utils.sandbox import SandboxPool
+from utils.outbound import OutboundSender
+from utils.scheduler import CommandScheduler, run_with_timeout
+from utils.suggest import SuggestionIndex
+from utils.watcher import DirectoryWatcher
 
-# Initialize Flask app
-app = Flask(__name__)
-
-@app.route('/')
-def home():
-    return 'Telegram UserBot is running!'
-
-def run_flask():
-    port = int(os.environ.get("PORT", 8080))
-    app.run(host='0.0.0.0', port=port)
-
-def main():
+def main(start=True):
+    """Run the userbot. With `start=False` the bot is built and returned without connecting."""
     try:
         # Load environment variables
         load_dotenv()
 
         # Configure logging
-        logger.add("bot.log", rotation="1 day", retention="7 days", level="INFO")
+        setup_logging(
+            "bot.log",
+            level=os.getenv('LOG_LEVEL', 'INFO').upper(),
+            json_logs=os.getenv('LOG_JSON', 'False').lower() == 'true'
+        )
 
         # Initialize language manager
         lang_manager = get_lang_manager()
+        metrics = get_metrics()
+        help_index = get_help_index()
 
         class UserBot:
             def __init__(self):
@@ -59,6 +69,87 @@ def main():
                 
                 # Command storage
                 self.commands = {}
+                self.aliases = {}
+                self.router = CommandRouter(self.prefix)
+                help_index.prefix = self.prefix
+                # "Did you mean" hints for unknown commands
+                self.suggestions = SuggestionIndex()
+                self.suggest_enabled = os.getenv('SUGGEST_COMMANDS', 'False').lower() == 'true'
+                self.suggest_descriptions = os.getenv('SUGGEST_DESCRIPTIONS', 'False').lower() == 'true'
+                self.registry = CommandRegistry(self.commands_dir)
+                
+                # Command execution: per-chat FIFO lanes with a global concurrency limit
+                self.command_timeout = float(os.getenv('COMMAND_TIMEOUT', 60))
+                self.scheduler = CommandScheduler(
+                    concurrency=int(os.getenv('MAX_CONCURRENT_COMMANDS', 8)),
+                    max_lane_depth=int(os.getenv('MAX_QUEUED_PER_CHAT', 20))
+                )
+                worker_paths = [os.path.dirname(os.path.abspath(__file__)), self.commands_dir]
+                # Rlimited workers for commands declaring `sandbox = True` and, if enabled, installed ones
+                self.sandbox = SandboxPool(
+                    size=int(os.getenv('SANDBOX_WORKERS', 2)),
+                    paths=worker_paths,
+                    cpu_seconds=int(os.getenv('SANDBOX_CPU_SECONDS', 5)),
+                    memory_mb=int(os.getenv('SANDBOX_MEMORY_MB', 512)),
+                    max_calls=int(os.getenv('SANDBOX_MAX_CALLS', 100)),
+                    max_rss_mb=int(os.getenv('SANDBOX_MAX_RSS_MB', 200))
+                )
+                # Worker pools for commands declaring `blocking = True` or `blocking = 'process'`
+                self.offloader = CommandOffloader(
+                    max_threads=int(os.getenv('COMMAND_THREADS', 4)),
+                    max_processes=int(os.getenv('COMMAND_PROCESSES', 2)),
+                    stall_threshold=float(os.getenv('STALL_THRESHOLD_MS', 100)) / 1000,
+                    auto_offload=os.getenv('AUTO_OFFLOAD_BLOCKING', 'False').lower() == 'true',
+                    worker_paths=worker_paths,
+                    sandbox=self.sandbox,
+                    sandbox_installed=os.getenv('SANDBOX_INSTALLED', 'False').lower() == 'true'
+                )
+                self.watcher = DirectoryWatcher(self.commands_dir, self.load_commands)
+                
+                # Rate-limited, FloodWait-aware reply delivery
+                self.outbound = OutboundSender(
+                    chat_rate=float(os.getenv('SEND_RATE_PER_CHAT', 1.0)),
+                    global_rate=float(os.getenv('SEND_RATE_GLOBAL', 25.0))
+                )
+                
+                # `!cmd install` registers the new command directly and replies through the sender
+                installer = get_installer()
+                installer.commands_dir = self.commands_dir
+                installer.register = self.register_command
+                installer.notify = self.outbound.reply
+                # Commands created in the web interface, with MONGO_SYNC=True
+                self.command_sync = None
+                if os.getenv('MONGO_SYNC', 'False').lower() == 'true':
+                    # Imported here so pymongo and the web models load only when enabled
+                    from utils.command_sync import get_command_sync
+                    self.command_sync = get_command_sync()
+                if self.command_sync is not None:
+                    self.command_sync.commands_dir = self.commands_dir
+                    self.command_sync.register = self.register_command
+                    # No !confirm step for the web panel, so its commands never run in-process
+                    self.offloader.untrusted = self.command_sync.synced
+                
+                # Per-chat and per-user language preferences
+                self.locales = get_locale_store()
+                # Language files are reloaded live when they change on disk
+                self.lang_watcher = DirectoryWatcher(lang_manager.lang_dir, lang_manager.reload)
+                lang_manager.add_listener(self.language_changed)
+                
+                # Replies of idempotent commands (`cache_ttl = ...`), dropped on reload and language change
+                self.response_cache = ResponseCache(maxsize=int(os.getenv('RESPONSE_CACHE_SIZE', 256)))
+                
+                metrics.queue_depth.set_function(lambda: self.scheduler.depth)
+                metrics.running.set_function(lambda: self.scheduler.stats.running)
+                metrics.queue_wait_avg.set_function(lambda: self.scheduler.stats.wait_avg)
+                metrics.queue_wait_max.set_function(lambda: self.scheduler.stats.wait_max)
+                
+                # Liveness/readiness endpoints on the client's event loop
+                self.max_ready_backlog = int(os.getenv('READY_MAX_BACKLOG', 100))
+                self.health = HealthServer(
+                    readiness=self.readiness,
+                    metrics=metrics.render,
+                    port=int(os.environ.get("PORT", 8080))
+                )
                 
                 # Load commands
                 self.load_commands()
@@ -67,103 +158,218 @@ def main():
                 self.client.add_event_handler(self.command_handler, events.NewMessage)
             
             def load_commands(self):
-                """Load all commands from the commands directory."""
+                """Load new, changed and removed commands from the commands directory."""
                 try:
-                    if not os.path.exists(self.commands_dir):
-                        os.makedirs(self.commands_dir)
-
-                    # Clear existing commands
-                    self.commands = {}
-
-                    # Remove commands_dir from sys.path if it exists
-                    if self.commands_dir in sys.path:
-                        sys.path.remove(self.commands_dir)
-
-                    # Add commands_dir to sys.path
-                    sys.path.insert(0, self.commands_dir)
-
-                    # Load each command
-                    for filename in os.listdir(self.commands_dir):
-                        if filename.endswith('.py') and not filename.startswith('_'):
-                            module_name = filename[:-3]
-                            logger.info(f"Attempting to load command: {module_name}")  # Log command loading attempt
-                            try:
-                                # Remove the module if it's already loaded
-                                if module_name in sys.modules:
-                                    del sys.modules[module_name]
-
-                                # Import the module
-                                module = importlib.import_module(module_name)
+                    started = time.perf_counter()
+                    result = self.registry.refresh()
+                    if not result and self.commands is self.registry.commands:
+                        return
+                    self.commands_changed(result, started)
+                except Exception as e:
+                    logger.error("Error in load_commands: {}\n{}", e, traceback.format_exc())
+            
+            def register_command(self, module_name, digest=None):
+                """Register (or drop) a single installed command without rescanning the directory."""
+                started = time.perf_counter()
+                result = self.registry.register(module_name, digest)
+                if result:
+                    self.commands_changed(result, started)
+                return result
+            
+            def commands_changed(self, result, started):
+                """Swap in the registry's commands and rebuild everything derived from them."""
+                self.response_cache.invalidate()
+                metrics.reloads.inc()
+                metrics.reload_duration.observe(time.perf_counter() - started)
 
-                                if hasattr(module, 'command'):
-                                    self.commands[module_name] = module.command
-                                    logger.info(f"Successfully loaded command: {module_name}")
-                                else:
-                                    logger.warning(f"Module {module_name} does not have a command function")
-                            except Exception as e:
-                                logger.error(f"Failed to load command {module_name}: {str(e)}")
+                self.commands = self.registry.commands
+                self.aliases = self.registry.aliases
+                self.router.rebuild(self.commands, self.aliases)
+                help_index.rebuild(self.registry.info, lang_manager.get_current_language())
+                self.suggestions.rebuild(
+                    self.router.table(),
+                    {name: info.description for name, info in self.registry.info.items()}
+                )
 
-                    # Log the loaded commands
-                    logger.info(f"Available commands after loading: {list(self.commands.keys())}")
-                except Exception as e:
-                    logger.error(f"Error in load_commands: {str(e)}\n{traceback.format_exc()}")
+                # Log the loaded commands
+                logger.info(
+                    "Reloaded commands (added: {}, changed: {}, removed: {})",
+                    result.added, result.changed, result.removed
+                )
+                logger.info("Available commands after loading: {}", list(self.commands.keys()))
             
             async def command_handler(self, event):
                 """Handle incoming commands."""
                 try:
-                    if event.message.text and event.message.text.startswith(self.prefix):
-                        command_text = event.message.text[len(self.prefix):]
-                        command_name = command_text.split()[0].lower()
-                        args = command_text.split()[1:] if len(command_text.split()) > 1 else []
+                    # Non-command text stops at the router's prefix check
+                    routed = self.router.route(event.message.text)
+                    metrics.messages_seen.inc()
+                    if routed is not None:
+                        command_name, invoked_name, args = routed
                         
-                        logger.info(f"Received command: {command_name} with args: {args}")
+                        logger.info("Received command: {} with args: {}", invoked_name, args)
                         
-                        # Reload commands if using cmd command
-                        if command_name == "cmd":
-                            self.load_commands()
-                            logger.info("Reloaded commands")
-                        
-                        if command_name in self.commands:
-                            try:
-                                logger.info(f"Executing command: {command_name}")
-                                result = await self.commands[command_name](event, args)
-                                
-                                # Handle both direct replies and dictionary returns
-                                if isinstance(result, dict):
-                                    prefix = result.get('prefix', '')
-                                    message = result.get('return', 'Command executed successfully')
-                                    if prefix:
-                                        message = f"[{prefix}] {message}"
-                                    await event.reply(message)
-                                    logger.info(f"Command {command_name} executed successfully")
-                            except Exception as e:
-                                error_msg = f"Error executing command {command_name}: {str(e)}\n{traceback.format_exc()}"
-                                logger.error(error_msg)
-                                await event.reply(f"Error executing command: {str(e)}")
+                        command = self.commands.get(command_name)
+                        if command is not None:
+                            metrics.commands_matched.inc()
+                            timeout = command.option('timeout', self.command_timeout)
+                            # execute_command times the command itself, so slow reply delivery
+                            # (FloodWait) is never reported as a command timeout
+                            queued = self.scheduler.submit(
+                                event.chat_id,
+                                command_name,
+                                lambda: self.execute_command(event, command_name, command, args, timeout)
+                            )
+                            if not queued:
+                                metrics.errors.inc(command_name, 'rejected')
                         else:
-                            logger.warning(f"Command not found: {command_name}")
+                            logger.warning("Command not found: {}", invoked_name)
+                            self.suggest_command(event, invoked_name)
+                except Exception as e:
+                    logger.opt(exception=True).error("Error in command handler: {}", e)
+            
+            def suggest_command(self, event, invoked_name):
+                """Reply with close matches for an unknown command, if there are any."""
+                # Only to the account's own messages, never to other people typing the prefix
+                if not self.suggest_enabled or not event.out:
+                    return
+                suggestions = self.suggestions.suggest(invoked_name, self.suggest_descriptions)
+                if not suggestions:
+                    return
+                text = lang_manager.get_text_for(
+                    self.language_for(event),
+                    "bot.did_you_mean",
+                    command=f"{self.prefix}{invoked_name}",
+                    suggestions=", ".join(f"{self.prefix}{name}" for name in suggestions)
+                )
+                self.scheduler.submit(event.chat_id, 'suggest', lambda: self.outbound.reply(event, text))
+            
+            def language_changed(self, lang):
+                """Drop rendered text after a default language switch or a language file reload."""
+                self.response_cache.invalidate()
+                help_index.rebuild(self.registry.info)
+            
+            def language_for(self, event) -> str:
+                """Language for replies to an event: sender's or chat's preference, else the default."""
+                return (
+                    self.locales.resolve(event.chat_id, getattr(event, 'sender_id', None))
+                    or lang_manager.get_default_language()
+                )
+            
+            async def execute_command(self, event, command_name, command, args, timeout=None):
+                """Run a command, cancelled after `timeout` seconds, and reply with its result."""
+                metrics.invocations.inc(command_name)
+                started = time.perf_counter()
+                status = 'cancelled'
+                lang = self.language_for(event)
+                # get_text in the command renders in this chat's language
+                language_token = use_language(lang)
+                try:
+                    logger.debug("Executing command: {}", command_name)
+                    ttl = response_ttl(command.option('cache_ttl'), args)
+                    result = self.response_cache.get(command_name, args, lang) if ttl else None
+                    if result is not None:
+                        metrics.cache_hits.inc()
+                    else:
+                        run = self.offloader.run(command_name, command, event, args)
+                        result = await run_with_timeout(run, timeout)
+                        if ttl:
+                            metrics.cache_misses.inc()
+                            if isinstance(result, dict):
+                                self.response_cache.set(command_name, args, lang, result, ttl)
+                    
+                    # Handle both direct replies and dictionary returns
+                    if isinstance(result, dict):
+                        prefix = result.get('prefix', '')
+                        message = result.get('return', 'Command executed successfully')
+                        if prefix:
+                            message = f"[{prefix}] {message}"
+                        await self.outbound.reply(event, message)
+                    status = 'ok'
+                except asyncio.CancelledError:
+                    raise
+                except asyncio.TimeoutError:
+                    status = 'timeout'
+                    logger.warning("Command {} timed out after {}s", command_name, timeout)
+                    await self.command_timed_out(event, command_name, timeout)
                 except Exception as e:
-                    logger.error(f"Error in command handler: {str(e)}\n{traceback.format_exc()}")
+                    status = 'error'
+                    metrics.errors.inc(command_name, 'exception')
+                    logger.opt(exception=True).error("Error executing command {}: {}", command_name, e)
+                    await self.outbound.reply(event, f"Error executing command: {str(e)}")
+                finally:
+                    reset_language(language_token)
+                    latency = time.perf_counter() - started
+                    metrics.latency.observe(latency, command_name)
+                    logger.bind(
+                        command=command_name, chat=event.chat_id, latency_ms=round(latency * 1000, 2), status=status
+                    ).info("Command {} finished ({}) in {:.1f}ms", command_name, status, latency * 1000)
+            
+            async def command_timed_out(self, event, command_name, timeout):
+                """Tell the user a command was cancelled by its timeout."""
+                metrics.errors.inc(command_name, 'timeout')
+                if self.outbound.blocked(event.chat_id):
+                    # The notice would only wait out the same FloodWait
+                    logger.info("Not sending timeout notice for {}, chat {} is flood-blocked", command_name, event.chat_id)
+                    return
+                await self.outbound.reply(
+                    event,
+                    lang_manager.get_text_for(
+                        self.language_for(event), "bot.command_timeout", command=command_name, timeout=timeout
+                    )
+                )
+            
+            def readiness(self):
+                """Ready when Telegram is connected and the command backlog is bounded."""
+                connected = self.client.is_connected()
+                backlog = self.scheduler.depth
+                details = {
+                    'telegram_connected': connected,
+                    'commands_loaded': len(self.commands),
+                    'backlog': backlog,
+                    'running': self.scheduler.stats.running,
+                    'scheduler': self.scheduler.stats.as_dict()
+                }
+                return connected and backlog < self.max_ready_backlog, details
             
             async def start(self):
                 """Start the userbot."""
                 logger.info("Starting userbot...")
+                # Bind the health port first, hosting platforms probe it during startup
+                await self.health.start()
+                # Pick up command changes on disk without a restart
+                self.watcher.start()
+                self.lang_watcher.start()
+                # Otherwise sandbox workers start with the first `sandbox = True` command
+                if self.offloader.sandbox_installed:
+                    self.sandbox.start()
+                if self.command_sync is not None:
+                    self.command_sync.start()
+                # Blocking imports now, before any chat is waiting on the loop
+                self.offloader.warm_up(self.commands)
+                await asyncio.get_running_loop().run_in_executor(None, self.locales.load)
                 await self.client.start()
                 logger.info("Userbot is running...")
-                await self.client.run_until_disconnected()
+                try:
+                    await self.client.run_until_disconnected()
+                finally:
+                    self.watcher.stop()
+                    self.lang_watcher.stop()
+                    if self.command_sync is not None:
+                        self.command_sync.stop()
+                    self.offloader.shutdown()
+                    self.locales.close()
+                    await self.health.stop()
 
-        # Start Flask server in a separate thread
-        flask_thread = threading.Thread(target=run_flask)
-        flask_thread.daemon = True
-        flask_thread.start()
-        
         # Start the bot
         logger.info("Starting Telegram UserBot...")
         bot = UserBot()
+        if not start:
+            return bot
         bot.client.loop.run_until_complete(bot.start())
 
     except Exception as e:
-        logger.error(f"Error in main: {str(e)}\n{traceback.format_exc()}")
+        logger.error("Error in main: {}\n{}", e, traceback.format_exc())
         sys.exit(1)
 
 if __name__ == '__main__':
@@ -22,6 +22,9 @@ from web.services.auth import AuthService
 
 logger = logging.getLogger('account_creator')
 
+# Synchronous MongoDB and password hashing, run on the worker thread pool
+blocking = True
+
 async def command(event, args):
     try:
         if len(args) < 2:
@@ -44,7 +47,7 @@ async def command(event, args):
         
         result = mongo.db.users.insert_one(user_data)
         if result.inserted_id:
-            logger.info(f"Kullanıcı oluşturuldu: {username}")
+            logger.info("Kullanıcı oluşturuldu: %s", username)
             return {
                 "prefix": "account_creator",
                 "return": "✅ Kullanıcı başarıyla oluşturuldu!"
@@ -55,7 +58,7 @@ async def command(event, args):
                 "return": "❌ Kullanıcı oluşturulamadı."
             }
     except Exception as e:
-        logger.error(f"Error creating account: {str(e)}")
+        logger.error("Error creating account: %s", e)
         return {
             "prefix": "account_creator",
             "return": "❌ Hata oluştu. Lütfen tekrar deneyin."
@@ -0,0 +1,12 @@
+from utils.installer import get_installer
+
+async def command(event, args):
+    """
+    Command: cancel
+    Description: Cancel installing a command that failed the security check
+    Usage: !cancel
+    """
+    return {
+        "prefix": "cmd",
+        "return": get_installer().cancel(event)
+    }
@@ -1,11 +1,17 @@
+import asyncio
 import os
 import logging
+import time
+from utils.installer import InstallError, get_installer
 from utils.language import get_lang_manager
+from utils.plugin_store import get_plugin_store
+from utils.security import scan_directory
 
-# Set up logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger('cmd_handler')
 
+# Only `!cmd list` is idempotent, install/remove reload and clear the cache
+cache_ttl = {'list': 300}
+
 async def command(event, args):
     """
     Command: cmd
@@ -14,6 +20,9 @@ async def command(event, args):
         !cmd list - List all installed commands
         !cmd install - Install command from replied Python file
         !cmd remove <name> - Remove a command
+        !cmd versions <name> - List stored versions of a command
+        !cmd rollback <name> [version] - Switch to an earlier (or the given) version
+        !cmd scan - Run the security check on all installed commands
     """
     try:
         logger.info("Command handler started with args: %s", args)
@@ -48,6 +57,22 @@ async def command(event, args):
                     "return": f"Error listing commands: {str(e)}"
                 }
         
+        elif action == "scan":
+            # Security check of every installed command; files seen before come from the cache
+            results = await asyncio.get_running_loop().run_in_executor(None, scan_directory, commands_dir)
+            flagged = [
+                f"• `{filename[:-3]}`: " + "; ".join(warnings)
+                for filename, (is_safe, warnings) in results.items() if not is_safe
+            ]
+            if not flagged:
+                message = lang_manager.get_text("cmd.scan_clean", count=len(results))
+            else:
+                message = f"{lang_manager.get_text('cmd.scan_title')}\n\n" + "\n".join(flagged)
+            return {
+                "prefix": "cmd",
+                "return": message
+            }
+        
         elif action == "install":
             logger.info("Install command initiated")
             # Check if the command is a reply to a message
@@ -63,64 +88,52 @@ async def command(event, args):
                 reply_msg = await event.message.get_reply_message()
                 logger.info("Got reply message")
                 
-                # Check if there's a file in the reply
-                if not reply_msg.file:
-                    logger.warning("No file in reply message")
-                    return {
-                        "prefix": "cmd",
-                        "return": lang_manager.get_text("cmd.install_no_python_file")
-                    }
-                
-                if not reply_msg.file.name.endswith('.py'):
-                    logger.warning("File is not a Python file: %s", reply_msg.file.name)
-                    return {
-                        "prefix": "cmd",
-                        "return": lang_manager.get_text("cmd.install_no_python_file")
-                    }
-                
-                # Download the file
-                file_path = os.path.join(commands_dir, reply_msg.file.name)
-                logger.info("Downloading file to: %s", file_path)
-                await reply_msg.download_media(file=file_path)
-                logger.info("File downloaded successfully")
-                
-                # Basic validation of the file content
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        logger.info("Reading file content")
-                        if "async def command" not in content:
-                            logger.warning("Invalid command format - missing async def command")
-                            os.remove(file_path)  # Remove invalid file
-                            return {
-                                "prefix": "cmd",
-                                "return": lang_manager.get_text("cmd.invalid_format")
-                            }
-                except Exception as e:
-                    logger.error("Error reading file: %s", str(e))
-                    if os.path.exists(file_path):
-                        os.remove(file_path)
-                    return {
-                        "prefix": "cmd",
-                        "return": f"Error reading file: {str(e)}"
-                    }
-                
-                command_name = reply_msg.file.name[:-3]  # Remove .py extension
-                logger.info("Command installed successfully: %s", command_name)
+                # Download, check, compile and register the command in one go
                 return {
                     "prefix": "cmd",
-                    "return": lang_manager.get_text("cmd.install_success", command=command_name)
+                    "return": await get_installer().install(event, reply_msg)
+                }
+            except InstallError as e:
+                logger.warning("Installation rejected: %s", e.key)
+                return {
+                    "prefix": "cmd",
+                    "return": e.render()
                 }
-                
             except Exception as e:
                 logger.error("Installation error: %s", str(e))
-                if 'file_path' in locals() and os.path.exists(file_path):
-                    os.remove(file_path)  # Clean up on error
                 return {
                     "prefix": "cmd",
                     "return": lang_manager.get_text("cmd.install_error", error=str(e))
                 }
         
+        elif action == "versions" and len(args) > 1:
+            cmd_name = args[1]
+            versions = get_plugin_store().versions(cmd_name)
+            if not versions:
+                return {
+                    "prefix": "cmd",
+                    "return": lang_manager.get_text("cmd.no_versions", command=cmd_name)
+                }
+            lines = [
+                f"• `{version.digest[:12]}` {time.strftime('%Y-%m-%d %H:%M', time.localtime(version.installed))}"
+                + (" ✅" if version.active else "")
+                for version in reversed(versions)
+            ]
+            return {
+                "prefix": "cmd",
+                "return": f"{lang_manager.get_text('cmd.versions_title', command=cmd_name)}\n\n" + "\n".join(lines)
+            }
+        
+        elif action == "rollback" and len(args) > 1:
+            try:
+                message = await get_installer().rollback(args[1], args[2] if len(args) > 2 else None)
+            except InstallError as e:
+                message = e.render()
+            return {
+                "prefix": "cmd",
+                "return": message
+            }
+        
         elif action == "remove" and len(args) > 1:
             cmd_name = args[1]
             if not cmd_name.endswith('.py'):
@@ -131,7 +144,8 @@ async def command(event, args):
             
             if os.path.exists(cmd_path):
                 try:
-                    os.remove(cmd_path)
+                    # Stored versions stay available for `!cmd rollback`
+                    get_plugin_store().deactivate(cmd_name[:-3], commands_dir)
                     logger.info("Command removed successfully: %s", cmd_name)
                     return {
                         "prefix": "cmd",
@@ -0,0 +1,16 @@
+from utils.installer import InstallError, get_installer
+
+async def command(event, args):
+    """
+    Command: confirm
+    Description: Confirm installing a command that failed the security check
+    Usage: !confirm
+    """
+    try:
+        message = await get_installer().confirm(event)
+    except InstallError as e:
+        message = e.render()
+    return {
+        "prefix": "cmd",
+        "return": message
+    }
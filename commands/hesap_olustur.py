@@ -17,6 +17,9 @@ from web.services.auth import AuthService
 
 logger = logging.getLogger('hesap_olustur')
 
+# Several synchronous MongoDB round-trips, run on the worker thread pool
+blocking = True
+
 async def command(event, args):
     """
     Command: hesap_olustur
@@ -37,11 +40,6 @@ async def command(event, args):
         if mongo is None:
             raise Exception("MongoDB is not initialized.")
 
-        # Check if the 'users' collection exists, if not create it
-        if 'users' not in mongo.db.list_collection_names():
-            mongo.db.create_collection('users')
-            logger.info("'users' collection created in MongoDB.")
-
         # Initialize auth service
         auth_service = AuthService(mongo.db)
 
@@ -56,9 +54,9 @@ async def command(event, args):
                     'created_at': datetime.utcnow()
                 }
                 mongo.db.users.insert_one(user_data)
-                logger.info(f"User created: {telegram_id}")
+                logger.info("User created: %s", telegram_id)
             else:
-                logger.info(f"User already exists: {telegram_id}")
+                logger.info("User already exists: %s", telegram_id)
             return user_data
 
         # Create user if it doesn't exist
@@ -66,7 +64,7 @@ async def command(event, args):
 
         # Set initial password
         if auth_service.set_user_password(telegram_id, temp_password):
-            logger.info(f"Created/updated user in MongoDB: {telegram_id}")
+            logger.info("Created/updated user in MongoDB: %s", telegram_id)
         else:
             raise Exception("Failed to set user password")
 
@@ -89,7 +87,7 @@ async def command(event, args):
         }
 
     except Exception as e:
-        logger.error(f"Error creating account: {str(e)}")
+        logger.error("Error creating account: %s", e)
         return {
             "prefix": "hesap_olustur",
             "return": f"❌ Hesap oluşturulurken bir hata oluştu: {str(e)}"
@@ -1,46 +1,77 @@
 from utils.language import get_lang_manager
+from utils.locales import CHAT, USER, get_locale_store
+
+# Only `!lang list` is idempotent, switching language clears the cache
+cache_ttl = {'list': 3600}
 
 async def command(event, args):
     """
     Command: lang
     Description: Change bot language or list available languages
-    Usage: 
+    Usage:
         !lang - Show current language
         !lang list - List available languages
-        !lang <code> - Change language (en/es/tr)
+        !lang <code> - Change language for this chat
+        !lang me <code> - Change language for yourself in every chat
+        !lang default <code> - Change the bot's default language
+        !lang reset / !lang me reset - Clear the chat's / your language
     """
     lang_manager = get_lang_manager()
-    
+    native_names = lang_manager.get_available_languages()
+
     if not args:
         # Show current language
         current = lang_manager.get_current_language()
-        native_names = lang_manager.get_available_languages()
         return {
             "prefix": "lang",
             "return": lang_manager.get_text("lang.current", lang=native_names[current])
         }
-    
+
     if args[0].lower() == "list":
         # List available languages
-        native_names = lang_manager.get_available_languages()
         languages = [f"• {code}: {name}" for code, name in native_names.items()]
         return {
             "prefix": "lang",
             "return": f"{lang_manager.get_text('lang.available')}\n\n" + "\n".join(languages)
         }
-    
-    # Change language
-    new_lang = args[0].lower()
-    if lang_manager.set_language(new_lang):
-        native_names = lang_manager.get_available_languages()
+
+    # Pick who the change applies to: this chat (default), the sender or the whole bot
+    scope = args[0].lower() if args[0].lower() in ("me", "default") else "chat"
+    if scope != "chat":
+        args = args[1:]
+    if not args:
         return {
             "prefix": "lang",
-            "return": lang_manager.get_text("lang.changed", lang=native_names[new_lang])
+            "return": lang_manager.get_text("lang.usage")
         }
+
+    store = get_locale_store()
+    if scope == "me":
+        store_scope, store_key = USER, event.sender_id
     else:
-        native_names = lang_manager.get_available_languages()
+        store_scope, store_key = CHAT, event.chat_id
+
+    new_lang = args[0].lower()
+    if new_lang == "reset" and scope != "default":
+        store.set(store_scope, store_key, None)
+        return {
+            "prefix": "lang",
+            "return": lang_manager.get_text_for(lang_manager.get_default_language(), "lang.reset")
+        }
+
+    if new_lang not in native_names:
         available = ", ".join(native_names.keys())
         return {
             "prefix": "lang",
             "return": lang_manager.get_text("lang.not_found", lang=new_lang, available=available)
         }
+
+    # Change language
+    if scope == "default":
+        lang_manager.set_language(new_lang)
+    else:
+        store.set(store_scope, store_key, new_lang)
+    return {
+        "prefix": "lang",
+        "return": lang_manager.get_text_for(new_lang, "lang.changed", lang=native_names[new_lang])
+    }
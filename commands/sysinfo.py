@@ -4,6 +4,11 @@ import time
 from datetime import datetime
 from utils.language import get_lang_manager
 
+# psutil calls block, run on the worker thread pool
+blocking = True
+# CPU and memory usage are fine to be a few seconds old
+cache_ttl = 5
+
 async def command(event, args):
     """
     Command: sysinfo
@@ -82,7 +82,7 @@ class SessionGenerator:
                 
                 return int(api_id), api_hash
             except ValueError as e:
-                logger.error(f"Invalid input: {str(e)}")
+                logger.error("Invalid input: %s", e)
                 print("Invalid input. Please try again.")
             except KeyboardInterrupt:
                 print("\nOperation cancelled by user.")
@@ -105,7 +105,7 @@ class SessionGenerator:
                     return client.session.save()
             except FloodWaitError as e:
                 wait_time = e.seconds
-                logger.warning(f"FloodWaitError: Need to wait {wait_time} seconds")
+                logger.warning("FloodWaitError: Need to wait %s seconds", wait_time)
                 print(f"\n=== FloodWaitError ===")
                 print(f"Telegram requires us to wait for {self.format_time(wait_time)}")
                 print("This is a security measure to prevent abuse.")
@@ -128,7 +128,7 @@ class SessionGenerator:
                 print("\nError: Invalid phone number format. Use international format (e.g., +1234567890)")
                 raise
             except Exception as e:
-                logger.error(f"Unexpected error: {str(e)}")
+                logger.error("Unexpected error: %s", e)
                 raise
 
     def save_to_file(self):
@@ -138,11 +138,11 @@ class SessionGenerator:
                 f.write(f"API_ID={self.api_id}\n")
                 f.write(f"API_HASH={self.api_hash}\n")
                 f.write(f"SESSION_STRING={self.session_string}\n")
-            logger.info(f"Credentials saved to {self.output_file}")
+            logger.info("Credentials saved to %s", self.output_file)
             print(f"\nCredentials saved to '{self.output_file}'")
             print("Make sure to keep this file secure and delete it after adding the credentials to Render.com")
         except Exception as e:
-            logger.error(f"Error saving to file: {str(e)}")
+            logger.error("Error saving to file: %s", e)
             print(f"\nError saving to file: {str(e)}")
 
     def run(self):
@@ -175,7 +175,7 @@ class SessionGenerator:
             logger.info("Process interrupted by user")
             print("\n\nProcess interrupted by user.")
         except Exception as e:
-            logger.error(f"Error: {str(e)}\n{traceback.format_exc()}")
+            logger.error("Error: %s\n%s", e, traceback.format_exc())
             print("\n=== Error Occurred ===")
             print(f"Error Type: {type(e).__name__}")
             print(f"Error Message: {str(e)}")
@@ -0,0 +1,113 @@
+"""
+Tests for utils.command_sync against a mongomock stand-in.
+
+Usage: python -m pytest tests
+"""
+import asyncio
+import time
+from datetime import datetime
+
+import pytest
+
+mongomock = pytest.importorskip('mongomock')
+pytest.importorskip('loguru')
+
+from utils import plugin_store
+from utils.command_sync import MongoCommandSync
+from utils.plugin_store import PluginStore
+from utils.registry import CommandRegistry
+from web.models.command import bump_commands_version
+
+CODE = 'async def command(event, args):\n    return {"prefix": "%s", "return": "%s"}\n'
+
+@pytest.fixture
+def env(tmp_path, monkeypatch):
+    commands_dir = tmp_path / 'commands'
+    commands_dir.mkdir()
+    (commands_dir / 'ping.py').write_text(CODE % ('ping', 'pong'))
+    monkeypatch.setattr(plugin_store, '_plugin_store', PluginStore(str(tmp_path / 'store')))
+
+    registry = CommandRegistry(str(commands_dir))
+    registry.refresh()
+    sync = MongoCommandSync('mongodb://localhost:27017/', 'userbot', str(commands_dir),
+                            state_path=str(tmp_path / 'store' / 'mongo_sync.json'))
+    sync.client = mongomock.MongoClient()
+    sync.db = sync.client.userbot
+    sync.register = registry.register
+    return sync, registry
+
+def put(db, name, code, is_active=True):
+    db.commands.update_one(
+        {'name': name},
+        {'$set': {'code': code, 'is_active': is_active, 'updated_at': datetime.utcnow()}},
+        upsert=True
+    )
+    bump_commands_version(db)
+    # Distinct updated_at values, mongomock keeps milliseconds
+    time.sleep(0.002)
+
+def sync_once(sync):
+    return asyncio.run(sync.sync())
+
+def test_create(env):
+    sync, registry = env
+    put(sync.db, 'hello', CODE % ('hello', 1))
+    changes = sync_once(sync)
+    assert [name for name, _ in changes] == ['hello']
+    assert 'hello' in registry.commands
+    assert sync_once(sync) == []
+
+def test_code_change(env):
+    sync, registry = env
+    put(sync.db, 'hello', CODE % ('hello', 1))
+    sync_once(sync)
+    put(sync.db, 'hello', CODE % ('hello', 2))
+    (name, digest), = sync_once(sync)
+    assert name == 'hello' and sync.synced['hello'] == digest
+    result = asyncio.run(registry.commands['hello'](None, []))
+    assert result['return'] == '2'
+
+def test_deactivation(env):
+    sync, registry = env
+    put(sync.db, 'hello', CODE % ('hello', 1))
+    sync_once(sync)
+    put(sync.db, 'hello', CODE % ('hello', 1), is_active=False)
+    assert sync_once(sync) == [('hello', None)]
+    assert 'hello' not in registry.commands
+
+def test_deletion(env):
+    sync, registry = env
+    put(sync.db, 'hello', CODE % ('hello', 1))
+    sync_once(sync)
+    sync.db.commands.delete_one({'name': 'hello'})
+    bump_commands_version(sync.db)
+    assert sync_once(sync) == [('hello', None)]
+    assert 'hello' not in registry.commands
+    assert sync.synced == {}
+
+def test_local_name_conflict(env):
+    sync, registry = env
+    put(sync.db, 'ping', CODE % ('ping', 'replaced'))
+    assert sync_once(sync) == []
+    result = asyncio.run(registry.commands['ping'](None, []))
+    assert result['return'] == 'pong'
+
+def test_invalid_name(env):
+    sync, registry = env
+    put(sync.db, 'bad name', CODE % ('bad', 1))
+    put(sync.db, '_private', CODE % ('private', 1))
+    assert sync_once(sync) == []
+    assert sorted(registry.commands) == ['ping']
+
+def test_flagged_code_is_refused(env):
+    sync, registry = env
+    put(sync.db, 'shell', 'import os\n' + CODE % ('shell', 1))
+    assert sync_once(sync) == []
+    assert 'shell' not in registry.commands
+
+def test_malformed_document_does_not_stall(env):
+    sync, registry = env
+    put(sync.db, 'broken', 123)
+    assert sync_once(sync) == []
+    put(sync.db, 'hello', CODE % ('hello', 1))
+    assert [name for name, _ in sync_once(sync)] == ['hello']
@@ -0,0 +1,20 @@
+import glob
+import os
+
+import pytest
+
+pytest.importorskip("yaml")
+
+from utils.catalog import check_catalogs, compile_catalog, flatten
+
+LANG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'languages')
+
+def test_languages_match_the_fallback():
+    import yaml
+
+    catalogs = {}
+    for path in glob.glob(os.path.join(LANG_DIR, '*.yml')):
+        with open(path, 'r', encoding='utf-8') as f:
+            catalogs[os.path.basename(path)[:-4]] = compile_catalog(flatten(yaml.safe_load(f)))
+    assert {'en', 'es', 'tr'} <= set(catalogs)
+    assert check_catalogs(catalogs, 'en') == []
@@ -0,0 +1,31 @@
+import inspect
+import logging
+
+import pytest
+
+pytest.importorskip("loguru")
+
+from loguru import logger
+from utils.log import InterceptHandler
+
+def log_from_here(stdlib):
+    stdlib.info("hello %s", "world")
+    return inspect.currentframe().f_lineno - 1
+
+def test_intercepted_record_keeps_the_caller():
+    records = []
+    sink = logger.add(lambda message: records.append(message.record), level="DEBUG")
+    stdlib = logging.getLogger("test_log")
+    stdlib.handlers = [InterceptHandler()]
+    stdlib.propagate = False
+    stdlib.setLevel(logging.DEBUG)
+    try:
+        line = log_from_here(stdlib)
+    finally:
+        logger.remove(sink)
+
+    record = records[-1]
+    assert record["message"] == "hello world"
+    assert record["name"] == __name__
+    assert record["function"] == "log_from_here"
+    assert record["line"] == line
@@ -0,0 +1,94 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Sequence, Tuple
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    Bounded LRU cache whose entries also expire after a per-entry TTL.
+    Not thread-safe; meant to be used from the event loop only.
+    """
+
+    def __init__(self, maxsize: int = 256, clock: Callable[[], float] = time.monotonic):
+        self.maxsize = maxsize
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._data: 'OrderedDict[Hashable, Tuple[float, Any]]' = OrderedDict()
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        self._data[key] = (self.clock() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def invalidate(self, predicate: Optional[Callable[[Hashable], bool]] = None) -> int:
+        """Drop every entry, or only those whose key matches `predicate`."""
+        if predicate is None:
+            dropped = len(self._data)
+            self._data.clear()
+            return dropped
+        keys = [key for key in self._data if predicate(key)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+def response_ttl(option: Any, args: Sequence[str]) -> Optional[float]:
+    """
+    Resolve a module's `cache_ttl` declaration for one invocation.
+    `cache_ttl = 60` caches every invocation, `cache_ttl = {'list': 300}`
+    only caches the listed first arguments ('' stands for no arguments).
+    """
+    if not option:
+        return None
+    if isinstance(option, dict):
+        first = args[0].lower() if args else ''
+        ttl = option.get(first)
+        return float(ttl) if ttl else None
+    return float(option)
+
+class ResponseCache:
+    """Caches replies of idempotent commands by command, arguments and language."""
+
+    def __init__(self, maxsize: int = 256):
+        self._cache = TTLCache(maxsize)
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        return {'hits': self._cache.hits, 'misses': self._cache.misses, 'size': len(self._cache)}
+
+    @staticmethod
+    def _key(command_name: str, args: Sequence[str], lang: str) -> Tuple:
+        return command_name, tuple(arg.strip() for arg in args), lang
+
+    def get(self, command_name: str, args: Sequence[str], lang: str) -> Any:
+        return self._cache.get(self._key(command_name, args, lang))
+
+    def set(self, command_name: str, args: Sequence[str], lang: str, response: Any, ttl: float):
+        self._cache.set(self._key(command_name, args, lang), response, ttl)
+
+    def invalidate(self, command_name: Optional[str] = None, lang: Optional[str] = None) -> int:
+        """Drop cached responses, optionally only those of one command or language."""
+        if command_name is None and lang is None:
+            return self._cache.invalidate()
+        return self._cache.invalidate(
+            lambda key: (command_name is None or key[0] == command_name) and (lang is None or key[2] == lang)
+        )
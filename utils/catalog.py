@@ -0,0 +1,151 @@
+import hashlib
+import marshal
+import os
+from string import Formatter
+from typing import Any, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Tuple
+import yaml
+from loguru import logger
+
+# Bump when the cache layout or flatten() output changes
+CATALOG_CACHE_VERSION = 1
+
+_formatter = Formatter()
+
+class Template:
+    """
+    A message parsed once at load time.
+    Plain text renders as-is; simple `{name}` fields render with a single
+    %-substitution. Anything fancier (format specs, attribute access) falls
+    back to `str.format`.
+    """
+    __slots__ = ('text', 'fields', '_literal', '_format', '_names')
+
+    def __init__(self, text: str):
+        self.text = text
+        literals, names, simple = [], [], True
+        for literal, field_name, format_spec, conversion in _formatter.parse(text):
+            literals.append(literal.replace('%', '%%'))
+            if field_name is None:
+                continue
+            if not field_name.isidentifier() or format_spec or conversion:
+                simple = False
+            literals.append('%s')
+            names.append(field_name)
+
+        self.fields: FrozenSet[str] = frozenset(
+            name.split('.', 1)[0].split('[', 1)[0] for name in names
+        )
+        self._names = tuple(names) if simple else None
+        self._format = ''.join(literals) if simple else None
+        # Text without fields still needs "{{"/"}}" unescaped, which parse() did
+        self._literal = ''.join(literals).replace('%%', '%') if not names else None
+
+    def render(self, kwargs: Mapping[str, Any]) -> str:
+        """Fill in the fields; raises KeyError if one is missing from `kwargs`."""
+        if self._literal is not None:
+            return self._literal
+        if self._names is not None:
+            return self._format % tuple([kwargs[name] for name in self._names])
+        return self.text.format(**kwargs)
+
+def flatten(data: Mapping[str, Any], prefix: str = '') -> Dict[str, str]:
+    """Flatten nested YAML sections into dotted keys ("help.title")."""
+    flat = {}
+    for key, value in (data or {}).items():
+        path = f"{prefix}{key}"
+        if isinstance(value, Mapping):
+            flat.update(flatten(value, f"{path}."))
+        elif value is not None:
+            flat[path] = str(value)
+    return flat
+
+def compile_catalog(messages: Mapping[str, str]) -> Dict[str, Template]:
+    """Pre-parse every message of a flattened language file."""
+    return {key: Template(text) for key, text in messages.items()}
+
+def check_catalogs(catalogs: Dict[str, Dict[str, Template]], reference: str = 'en') -> List[str]:
+    """
+    Compare every catalog against the reference language.
+    Returns one line per problem: missing keys, keys the reference does not
+    have, and messages whose placeholders differ from the reference.
+    """
+    problems = []
+    base = catalogs.get(reference)
+    if base is None:
+        return [f"reference language '{reference}' is not loaded"]
+
+    for lang_code in sorted(catalogs):
+        if lang_code == reference:
+            continue
+        catalog = catalogs[lang_code]
+        for key in sorted(base.keys() - catalog.keys()):
+            problems.append(f"{lang_code}: missing key '{key}'")
+        for key in sorted(catalog.keys() - base.keys()):
+            problems.append(f"{lang_code}: key '{key}' is not in {reference}")
+        for key in sorted(base.keys() & catalog.keys()):
+            expected, found = base[key].fields, catalog[key].fields
+            if expected != found:
+                problems.append(
+                    f"{lang_code}: '{key}' has placeholders {sorted(found)}, {reference} has {sorted(expected)}"
+                )
+    return problems
+
+class CatalogHeader(NamedTuple):
+    """What a cached catalog was built from, stored ahead of its messages."""
+    version: int
+    mtime_ns: int
+    size: int
+    digest: str
+    name: str
+
+def _read_cache(cache_path: str, header_only: bool) -> Tuple[Optional[CatalogHeader], Optional[Dict[str, str]]]:
+    try:
+        with open(cache_path, 'rb') as f:
+            header = CatalogHeader(*marshal.load(f))
+            if header.version != CATALOG_CACHE_VERSION:
+                return None, None
+            return header, None if header_only else marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None, None
+
+def _write_cache(cache_path: str, header: CatalogHeader, messages: Dict[str, str]):
+    tmp_path = f"{cache_path}.tmp"
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(tmp_path, 'wb') as f:
+            marshal.dump(tuple(header), f)
+            marshal.dump(messages, f)
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.warning("Failed to write catalog cache {}: {}", cache_path, e)
+
+def read_catalog(path: str, cache_path: str,
+                 header_only: bool = False) -> Tuple[CatalogHeader, Optional[Dict[str, str]]]:
+    """
+    Get a language file's header and flattened messages, via a binary cache.
+    The cache is trusted when the file's mtime and size match. Otherwise the
+    file is hashed and only parsed again if its content actually changed.
+    With `header_only` the messages are not read (None) when the cache is valid.
+    """
+    stat = os.stat(path)
+    header, messages = _read_cache(cache_path, header_only)
+    if header is not None and (header.mtime_ns, header.size) == (stat.st_mtime_ns, stat.st_size):
+        return header, messages
+
+    with open(path, 'rb') as f:
+        source = f.read()
+    digest = hashlib.sha256(source).hexdigest()
+    if header is not None and header.digest == digest:
+        if messages is None:
+            header, messages = _read_cache(cache_path, False)
+    else:
+        header = None
+    if header is None or messages is None:
+        messages = flatten(yaml.safe_load(source))
+
+    lang_code = os.path.splitext(os.path.basename(path))[0]
+    header = CatalogHeader(
+        CATALOG_CACHE_VERSION, stat.st_mtime_ns, stat.st_size, digest, messages.get('language.name', lang_code)
+    )
+    _write_cache(cache_path, header, messages)
+    return header, messages
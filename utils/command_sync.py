@@ -0,0 +1,183 @@
+import asyncio
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from loguru import logger
+from pymongo import ASCENDING, MongoClient
+from pymongo.errors import PyMongoError
+from utils.installer import CommandInstaller, InstallError
+from utils.plugin_store import get_plugin_store
+from web.models.command import commands_version
+
+class MongoCommandSync:
+    """
+    Mirrors the commands created in the web interface (MongoDB `commands`
+    collection) into the running bot.
+    Each poll reads the collection's version counter and stops there if no
+    write happened. Otherwise it fetches only the documents whose
+    `updated_at` is at or after the last one seen, plus the (index-covered)
+    list of names to spot deletions. Active documents are stored and
+    activated through the plugin store, inactive and deleted ones are
+    deactivated, and each change is registered on its own.
+    There is no `!confirm` step for the web panel, so documents the
+    SecurityChecker flags are refused, and the bot runs the synced ones in
+    its SandboxPool (CommandOffloader.untrusted). Names of commands that did not come
+    from MongoDB are never touched.
+    """
+
+    def __init__(self, uri: str, db_name: str, commands_dir: str = 'commands',
+                 interval: float = 10.0, state_path: Optional[str] = None):
+        self.client = MongoClient(uri, serverSelectionTimeoutMS=5000, connect=False)
+        self.db = self.client[db_name]
+        self.commands_dir = commands_dir
+        self.interval = interval
+        self.state_path = state_path or os.path.join(get_plugin_store().root, 'mongo_sync.json')
+        # Set by the bot: register(module_name, digest), digest None to drop
+        self.register: Optional[Callable[[str, Optional[str]], Any]] = None
+        self._synced: Optional[Dict[str, str]] = None
+        self._version: Optional[int] = None
+        self._watermark: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def synced(self) -> Dict[str, str]:
+        """Commands mirrored from MongoDB: name -> digest of the synced code."""
+        if self._synced is None:
+            try:
+                with open(self.state_path, 'r', encoding='utf-8') as f:
+                    self._synced = json.load(f)['commands']
+            except (OSError, ValueError, KeyError):
+                self._synced = {}
+        return self._synced
+
+    def _save_state(self):
+        os.makedirs(os.path.dirname(self.state_path) or '.', exist_ok=True)
+        tmp_path = f"{self.state_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'commands': self.synced}, f)
+        os.replace(tmp_path, self.state_path)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.client.close()
+
+    async def _run(self):
+        while True:
+            try:
+                await self.sync()
+            except PyMongoError as e:
+                logger.warning("Command sync with MongoDB failed: {}", e)
+            except Exception as e:
+                logger.error("Command sync error: {}", e)
+            await asyncio.sleep(self.interval)
+
+    async def sync(self) -> List[Tuple[str, Optional[str]]]:
+        """Run one poll and register what changed; returns [(name, digest or None)]."""
+        loop = asyncio.get_running_loop()
+        changes = await loop.run_in_executor(None, self.poll)
+        for module_name, digest in changes:
+            if self.register is not None:
+                self.register(module_name, digest)
+        return changes
+
+    def poll(self) -> List[Tuple[str, Optional[str]]]:
+        """Fetch changes and update the commands directory. Blocking, runs in a worker thread."""
+        version = commands_version(self.db)
+        if version == self._version:
+            return []
+
+        # $gte: a write in the same millisecond as the watermark may land after this read
+        query = {'updated_at': {'$gte': self._watermark}} if self._watermark else {}
+        docs = list(self.db.commands.find(
+            query, {'_id': 0, 'name': 1, 'code': 1, 'is_active': 1, 'updated_at': 1}
+        ).sort('updated_at', ASCENDING))
+        names = {doc['name'] for doc in self.db.commands.find({}, {'_id': 0, 'name': 1})}
+
+        changes = []
+        for doc in docs:
+            # Move past every document, a bad one must not be fetched again forever
+            updated_at = doc.get('updated_at')
+            if isinstance(updated_at, datetime) and (self._watermark is None or updated_at > self._watermark):
+                self._watermark = updated_at
+            try:
+                change = self._apply(doc)
+            except Exception as e:
+                logger.warning("Skipping MongoDB command {!r}: {}: {}", doc.get('name'), type(e).__name__, e)
+                continue
+            if change is not None:
+                changes.append(change)
+        for module_name in [name for name in self.synced if name not in names]:
+            changes.append(self._drop(module_name))
+
+        self._version = version
+        if changes:
+            self._save_state()
+            logger.info("Synced {} commands from MongoDB", len(changes))
+        return changes
+
+    def _apply(self, doc: Dict) -> Optional[Tuple[str, Optional[str]]]:
+        module_name, code = doc.get('name'), doc.get('code')
+        if not isinstance(module_name, str) or not module_name.isidentifier() or module_name.startswith('_'):
+            logger.warning("Skipping MongoDB command with invalid name: {!r}", module_name)
+            return None
+        if not doc.get('is_active', True) or not code:
+            return self._drop(module_name) if module_name in self.synced else None
+        if not isinstance(code, str):
+            logger.warning("Skipping MongoDB command {}: code is not a string", module_name)
+            return None
+
+        try:
+            source = code.encode('utf-8')
+        except UnicodeEncodeError:
+            logger.warning("Skipping MongoDB command {}: code is not valid UTF-8", module_name)
+            return None
+        digest = hashlib.sha256(source).hexdigest()
+        if self.synced.get(module_name) == digest:
+            return None
+        path = os.path.join(self.commands_dir, module_name + '.py')
+        if module_name not in self.synced and os.path.exists(path):
+            logger.warning("Not syncing MongoDB command {}: a local command has that name", module_name)
+            return None
+        try:
+            warnings = CommandInstaller.analyze(module_name, source)
+        except InstallError as e:
+            logger.warning("Not syncing MongoDB command {}: {} {}", module_name, e.key, e.kwargs)
+            return None
+        if warnings:
+            logger.warning("Not syncing MongoDB command {}, flagged by the security check: {}", module_name, warnings)
+            return self._drop(module_name) if module_name in self.synced else None
+
+        store = get_plugin_store()
+        store.add(module_name, source, digest)
+        store.activate(module_name, digest, self.commands_dir)
+        self.synced[module_name] = digest
+        return module_name, digest
+
+    def _drop(self, module_name: str) -> Tuple[str, None]:
+        get_plugin_store().deactivate(module_name, self.commands_dir)
+        self.synced.pop(module_name, None)
+        logger.info("Removed MongoDB command {}", module_name)
+        return module_name, None
+
+# Global instance
+_command_sync = None
+
+def get_command_sync() -> Optional[MongoCommandSync]:
+    """Get the MongoDB command sync, or None unless MONGO_SYNC is enabled."""
+    global _command_sync
+    if _command_sync is None and os.getenv('MONGO_SYNC', 'False').lower() == 'true' and os.getenv('MONGO_URI'):
+        _command_sync = MongoCommandSync(
+            os.getenv('MONGO_URI'),
+            os.getenv('MONGO_DB_NAME', 'userbot'),
+            os.getenv('COMMANDS_DIR', 'commands'),
+            float(os.getenv('MONGO_SYNC_INTERVAL', 10))
+        )
+    return _command_sync
@@ -0,0 +1,54 @@
+import time
+from typing import Callable, Dict, Tuple
+from aiohttp import web
+from loguru import logger
+
+class HealthServer:
+    """
+    Health, readiness and metrics endpoints served on the bot's own event loop.
+    - /         plain banner for uptime pingers
+    - /healthz  liveness: answers as long as the event loop is responsive
+    - /readyz   readiness: 503 until `readiness()` reports ready
+    - /metrics  Prometheus text from `metrics()`
+    """
+
+    def __init__(self, readiness: Callable[[], Tuple[bool, Dict]], metrics: Callable[[], str],
+                 host: str = '0.0.0.0', port: int = 8080):
+        self.readiness = readiness
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self.started_at = time.monotonic()
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_get('/', self.home)
+        self.app.router.add_get('/healthz', self.liveness)
+        self.app.router.add_get('/readyz', self.ready)
+        self.app.router.add_get('/metrics', self.render_metrics)
+
+    async def home(self, request: web.Request) -> web.Response:
+        return web.Response(text='Telegram UserBot is running!')
+
+    async def liveness(self, request: web.Request) -> web.Response:
+        return web.json_response({'status': 'alive', 'uptime': round(time.monotonic() - self.started_at, 1)})
+
+    async def ready(self, request: web.Request) -> web.Response:
+        ready, details = self.readiness()
+        details['status'] = 'ready' if ready else 'not ready'
+        return web.json_response(details, status=200 if ready else 503)
+
+    async def render_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(text=self.metrics(), content_type='text/plain', charset='utf-8')
+
+    async def start(self):
+        """Start listening; returns once the port is bound."""
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("Health server listening on {}:{}", self.host, self.port)
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
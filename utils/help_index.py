@@ -0,0 +1,106 @@
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from utils.language import get_lang_manager
+from utils.manifest import CommandInfo
+
+# Built-in commands take their help text from the language files
+BUILTIN_COMMANDS = {'help', 'cmd', 'ping', 'echo', 'sysinfo', 'lang'}
+
+class HelpEntry(NamedTuple):
+    module_name: str
+    name: str
+    description: Optional[str]
+    usage: Optional[str]
+    builtin: bool
+
+class HelpIndex:
+    """
+    Help text for every registered command, rebuilt only when the registry
+    changes. Rendered listings are cached per language, so `!help` is a
+    dict lookup and a slice regardless of how many commands are installed.
+    """
+
+    def __init__(self, prefix: str = '!'):
+        self.prefix = prefix
+        self._commands: Dict[str, CommandInfo] = {}
+        self._names: Dict[str, str] = {}
+        self._entries: Dict[str, Dict[str, HelpEntry]] = {}
+        self._listings: Dict[str, List[str]] = {}
+
+    def rebuild(self, info: Dict[str, CommandInfo], lang: Optional[str] = None):
+        """Index the registry's command metadata; pre-render the listing for `lang`."""
+        names = {}
+        for module_name, command_info in info.items():
+            for alias in [command_info.name] + list(command_info.aliases):
+                names.setdefault(alias.lower(), module_name)
+        for module_name in info:
+            names[module_name.lower()] = module_name
+
+        self._commands = dict(info)
+        self._names = names
+        self._entries = {}
+        self._listings = {}
+        if lang:
+            self.listing(lang)
+
+    def _entries_for(self, lang: str) -> Dict[str, HelpEntry]:
+        entries = self._entries.get(lang)
+        if entries is not None:
+            return entries
+
+        lang_manager = get_lang_manager()
+        entries = {}
+        for module_name, command_info in self._commands.items():
+            if module_name in BUILTIN_COMMANDS:
+                # Use translations for built-in commands
+                entries[module_name] = HelpEntry(
+                    module_name,
+                    lang_manager.get_text_for(lang, f"commands.{module_name}.name"),
+                    lang_manager.get_text_for(lang, f"commands.{module_name}.description"),
+                    lang_manager.get_text_for(lang, f"commands.{module_name}.usage"),
+                    True
+                )
+            else:
+                # Use docstring for external commands
+                entries[module_name] = HelpEntry(
+                    module_name, command_info.name, command_info.description, command_info.usage, False
+                )
+        self._entries[lang] = entries
+        return entries
+
+    def listing(self, lang: str) -> List[str]:
+        """One sorted line per command, in the given language."""
+        lines = self._listings.get(lang)
+        if lines is None:
+            lines = []
+            for entry in self._entries_for(lang).values():
+                if entry.description:
+                    lines.append(f"• `{self.prefix}{entry.name}` - {entry.description}")
+                else:
+                    lines.append(f"• `{self.prefix}{entry.module_name}` - No description available")
+            lines.sort()
+            self._listings[lang] = lines
+        return lines
+
+    def page(self, lang: str, page: int, page_size: int) -> Tuple[List[str], int, int]:
+        """Get (lines, page, pages) for a 1-based page number, clamped to range."""
+        lines = self.listing(lang)
+        pages = max(1, -(-len(lines) // page_size))
+        page = min(max(page, 1), pages)
+        start = (page - 1) * page_size
+        return lines[start:start + page_size], page, pages
+
+    def lookup(self, name: str, lang: str) -> Optional[HelpEntry]:
+        """Find a command by module name, docstring name or alias."""
+        module_name = self._names.get(name.lower())
+        if module_name is None:
+            return None
+        return self._entries_for(lang).get(module_name)
+
+# Global instance
+_help_index = None
+
+def get_help_index() -> HelpIndex:
+    global _help_index
+    if _help_index is None:
+        _help_index = HelpIndex()
+    return _help_index
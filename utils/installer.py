@@ -0,0 +1,170 @@
+import asyncio
+import hashlib
+import os
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
+from loguru import logger
+from utils.language import get_lang_manager
+from utils.manifest import inspect_source
+from utils.plugin_store import get_plugin_store
+from utils.security import SecurityChecker
+
+class InstallError(Exception):
+    """An installation step failed; `key` and `kwargs` describe it for the user."""
+
+    def __init__(self, key: str, **kwargs):
+        super().__init__(key)
+        self.key = key
+        self.kwargs = kwargs
+
+    def render(self) -> str:
+        return get_lang_manager().get_text(self.key, **self.kwargs)
+
+class PendingInstall(NamedTuple):
+    module_name: str
+    source: bytes
+    digest: str
+    expiry: asyncio.TimerHandle
+
+class CommandInstaller:
+    """
+    Installs command modules sent as Telegram files:
+    download into memory (size capped) -> hash -> AST checks in a worker
+    thread -> byte-compile into the plugin store -> atomic rename into the
+    commands directory -> register only that command. Files flagged by the SecurityChecker wait
+    for `!confirm` / `!cancel` from the same user in the same chat.
+    """
+
+    def __init__(self, commands_dir: str = 'commands', max_size: int = 256 * 1024,
+                 confirm_timeout: float = 30.0):
+        self.commands_dir = commands_dir
+        self.max_size = max_size
+        self.confirm_timeout = confirm_timeout
+        # Set by the bot: register(module_name, digest) and notify(event, text)
+        self.register: Optional[Callable[[str, str], Any]] = None
+        self.notify: Optional[Callable[[Any, str], Awaitable[Any]]] = None
+        self._pending: Dict[Tuple[Hashable, Hashable], PendingInstall] = {}
+
+    async def download(self, message) -> Tuple[str, bytes]:
+        """Download a replied .py file into memory, giving up once it exceeds `max_size`."""
+        file = message.file if message is not None else None
+        if not file or not (file.name or '').endswith('.py'):
+            raise InstallError("cmd.install_no_python_file")
+        module_name = os.path.basename(file.name)[:-3]
+        if not module_name.isidentifier() or module_name.startswith('_'):
+            raise InstallError("cmd.invalid_format")
+        if file.size and file.size > self.max_size:
+            raise InstallError("cmd.install_too_large", limit=self.max_size // 1024)
+
+        buffer = bytearray()
+        async for chunk in message.client.iter_download(message.media):
+            buffer += chunk
+            if len(buffer) > self.max_size:
+                raise InstallError("cmd.install_too_large", limit=self.max_size // 1024)
+        return module_name, bytes(buffer)
+
+    @staticmethod
+    def analyze(module_name: str, source: bytes) -> List[str]:
+        """Validate a command module and get its security warnings. CPU bound, runs in a worker."""
+        try:
+            text = source.decode('utf-8')
+            info = inspect_source(module_name, text)
+        except (UnicodeDecodeError, SyntaxError, ValueError) as e:
+            raise InstallError("cmd.install_error", error=str(e))
+        if not info.has_command:
+            raise InstallError("cmd.invalid_format")
+        _, warnings = SecurityChecker(text).check_code()
+        return warnings
+
+    async def install(self, event, message) -> str:
+        """Run the pipeline for a replied file; returns the reply text."""
+        module_name, source = await self.download(message)
+        digest = hashlib.sha256(source).hexdigest()
+        loop = asyncio.get_running_loop()
+        warnings = await loop.run_in_executor(None, self.analyze, module_name, source)
+
+        lang_manager = get_lang_manager()
+        if warnings:
+            key = (event.chat_id, event.sender_id)
+            self._drop(key)
+            expiry = loop.call_later(self.confirm_timeout, self._expire, key, event)
+            self._pending[key] = PendingInstall(module_name, source, digest, expiry)
+            logger.info("Installation of {} waiting for confirmation: {}", module_name, warnings)
+            return lang_manager.get_text("cmd.install_security_check", warnings="\n".join(warnings))
+
+        await self._commit(module_name, source, digest)
+        return lang_manager.get_text("cmd.install_success", command=module_name)
+
+    async def confirm(self, event) -> str:
+        """Install the file waiting for this user's confirmation."""
+        lang_manager = get_lang_manager()
+        pending = self._drop((event.chat_id, event.sender_id))
+        if pending is None:
+            return lang_manager.get_text("cmd.install_nothing_pending")
+        await self._commit(pending.module_name, pending.source, pending.digest)
+        return "\n".join([
+            lang_manager.get_text("cmd.install_confirmed"),
+            lang_manager.get_text("cmd.install_success", command=pending.module_name),
+        ])
+
+    def cancel(self, event) -> str:
+        """Discard the file waiting for this user's confirmation."""
+        lang_manager = get_lang_manager()
+        pending = self._drop((event.chat_id, event.sender_id))
+        if pending is None:
+            return lang_manager.get_text("cmd.install_nothing_pending")
+        logger.info("Installation of {} cancelled", pending.module_name)
+        return lang_manager.get_text("cmd.install_cancelled")
+
+    def _drop(self, key) -> Optional[PendingInstall]:
+        pending = self._pending.pop(key, None)
+        if pending is not None:
+            pending.expiry.cancel()
+        return pending
+
+    def _expire(self, key, event):
+        # Runs in a copy of the installing command's context, so in its language
+        pending = self._pending.pop(key, None)
+        if pending is None:
+            return
+        logger.info("Installation of {} timed out", pending.module_name)
+        if self.notify is not None:
+            asyncio.ensure_future(self.notify(event, get_lang_manager().get_text("cmd.install_timeout")))
+
+    async def _commit(self, module_name: str, source: bytes, digest: str):
+        await asyncio.get_running_loop().run_in_executor(None, self._write, module_name, source, digest)
+        if self.register is not None:
+            self.register(module_name, digest)
+        logger.info("Installed command {} ({})", module_name, digest[:12])
+
+    def _write(self, module_name: str, source: bytes, digest: str):
+        """Store and byte-compile the version, then move its source into place atomically."""
+        store = get_plugin_store()
+        try:
+            store.add(module_name, source, digest)
+            store.activate(module_name, digest, self.commands_dir)
+        except (OSError, SyntaxError, ValueError) as e:
+            raise InstallError("cmd.install_error", error=str(e))
+
+    async def rollback(self, module_name: str, version: Optional[str] = None) -> str:
+        """Switch a command to a stored version (default: the one before the active one, or the removed one)."""
+        store = get_plugin_store()
+        digest = store.find(module_name, version)
+        if digest is None:
+            raise InstallError("cmd.version_not_found", command=module_name)
+        await asyncio.get_running_loop().run_in_executor(
+            None, store.activate, module_name, digest, self.commands_dir
+        )
+        if self.register is not None:
+            self.register(module_name, digest)
+        return get_lang_manager().get_text("cmd.rollback_success", command=module_name, version=digest[:12])
+
+# Global instance
+_installer = None
+
+def get_installer() -> CommandInstaller:
+    global _installer
+    if _installer is None:
+        _installer = CommandInstaller(
+            os.getenv('COMMANDS_DIR', 'commands'), int(os.getenv('MAX_COMMAND_SIZE_KB', 256)) * 1024
+        )
+    return _installer
@@ -1,65 +1,206 @@
 import os
 import yaml
-from typing import Dict, Any
+from contextvars import ContextVar, Token
+from typing import Callable, Dict, List, Optional
+from loguru import logger
+from utils.catalog import CatalogHeader, Template, check_catalogs, compile_catalog, read_catalog
+
+# Compiled catalogs are cached in this subdirectory of the languages directory
+CACHE_DIR = '.catalogs'
+
+# Language of the command being handled; each task sees its own value
+_context_lang: ContextVar[Optional[str]] = ContextVar('lang', default=None)
+
+def use_language(lang_code: Optional[str]) -> Token:
+    """Render get_text in `lang_code` for the current task. Undo with reset_language."""
+    return _context_lang.set(lang_code)
+
+def reset_language(token: Token):
+    _context_lang.reset(token)
 
 class LanguageManager:
-    def __init__(self, lang_dir: str = "languages"):
+    """
+    Message catalogs, one per YAML file in `lang_dir`.
+    Only the default and fallback languages are loaded up front; others are
+    loaded on first use. Parsed catalogs are cached in `lang_dir/.catalogs`,
+    and `reload()` picks up edited, added or removed files.
+    """
+
+    def __init__(self, lang_dir: str = "languages", fallback_lang: str = "en"):
         self.lang_dir = lang_dir
+        self.cache_dir = os.path.join(lang_dir, CACHE_DIR)
+        self.fallback_lang = fallback_lang
         self.current_lang = "en"
-        self.languages: Dict[str, Dict[str, Any]] = {}
+        # Language files on disk and the headers of the ones read so far
+        self._files: Dict[str, str] = {}
+        self._headers: Dict[str, CatalogHeader] = {}
+        # Per-language messages as found in the YAML files
+        self.catalogs: Dict[str, Dict[str, Template]] = {}
+        # Per-language lookup tables with the fallback language merged in
+        self._resolved: Dict[str, Dict[str, Template]] = {}
+        self._listeners: List[Callable[[str], None]] = []
         self.load_languages()
     
+    def _scan(self) -> Dict[str, str]:
+        return {
+            filename[:-4]: os.path.join(self.lang_dir, filename)
+            for filename in sorted(os.listdir(self.lang_dir)) if filename.endswith('.yml')
+        }
+    
+    def _cache_path(self, lang_code: str) -> str:
+        return os.path.join(self.cache_dir, f"{lang_code}.bin")
+    
     def load_languages(self):
-        """Load all language files from the languages directory."""
-        for filename in os.listdir(self.lang_dir):
-            if filename.endswith('.yml'):
-                lang_code = filename[:-4]
-                with open(os.path.join(self.lang_dir, filename), 'r', encoding='utf-8') as f:
-                    self.languages[lang_code] = yaml.safe_load(f)
+        """Find the language files and load the default and fallback languages."""
+        self._files = self._scan()
+        for lang_code in dict.fromkeys([self.fallback_lang, self.current_lang]):
+            if lang_code in self._files and lang_code not in self.catalogs:
+                self._load(lang_code)
+    
+    def _load(self, lang_code: str) -> Dict[str, Template]:
+        header, messages = read_catalog(self._files[lang_code], self._cache_path(lang_code))
+        catalog = compile_catalog(messages)
+        self._headers[lang_code] = header
+        self.catalogs[lang_code] = catalog
+        self._resolved.pop(lang_code, None)
+
+        fallback = self.catalogs.get(self.fallback_lang)
+        if lang_code != self.fallback_lang and fallback is not None:
+            for problem in check_catalogs({self.fallback_lang: fallback, lang_code: catalog}, self.fallback_lang):
+                logger.warning("Language catalog: {}", problem)
+        return catalog
+    
+    def _resolve(self, lang_code: str) -> Dict[str, Template]:
+        """Merge the fallback language under a catalog, so a lookup is one dict hit."""
+        if lang_code not in self._files:
+            lang_code = self.fallback_lang
+        resolved = self._resolved.get(lang_code)
+        if resolved is None:
+            catalog = self.catalogs.get(lang_code)
+            if catalog is None and lang_code in self._files:
+                catalog = self._load(lang_code)
+            fallback = self.catalogs.get(self.fallback_lang, {})
+            resolved = self._resolved[lang_code] = {**fallback, **(catalog or {})}
+        return resolved
+    
+    def reload(self) -> List[str]:
+        """
+        Pick up changed language files. Loaded catalogs that changed are read
+        again right away; listeners are called with each changed language.
+        """
+        files = self._scan()
+        changed = [lang_code for lang_code in self._files if lang_code not in files]
+        for lang_code, path in files.items():
+            header = self._headers.get(lang_code)
+            if header is None:
+                if lang_code not in self._files:
+                    changed.append(lang_code)
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            if (header.mtime_ns, header.size) != (stat.st_mtime_ns, stat.st_size):
+                # Touched or rewritten files only count if their content changed
+                try:
+                    self._headers[lang_code], _ = read_catalog(path, self._cache_path(lang_code), header_only=True)
+                except (OSError, yaml.YAMLError) as e:
+                    logger.error("Failed to read language file {}, keeping the loaded version: {}", path, e)
+                    continue
+                if self._headers[lang_code].digest != header.digest:
+                    changed.append(lang_code)
+        self._files = files
+        if not changed:
+            return []
+
+        for lang_code in changed:
+            self._headers.pop(lang_code, None)
+            self._resolved.pop(lang_code, None)
+            if lang_code not in files:
+                try:
+                    os.remove(self._cache_path(lang_code))
+                except OSError:
+                    pass
+            if lang_code in self.catalogs and lang_code in files:
+                self._load(lang_code)
+            else:
+                self.catalogs.pop(lang_code, None)
+        if self.fallback_lang in changed:
+            self._resolved.clear()
+        logger.info("Reloaded languages: {}", ', '.join(sorted(changed)))
+        for lang_code in changed:
+            for listener in self._listeners:
+                listener(lang_code)
+        return changed
     
     def get_text(self, key: str, **kwargs) -> str:
         """
-        Get text in current language.
+        Get text in current language: the one set with use_language for this
+        command, or the bot's default.
         Example: get_text("help.title")
         """
+        return self.get_text_for(_context_lang.get() or self.current_lang, key, **kwargs)
+    
+    def get_text_for(self, lang_code: str, key: str, **kwargs) -> str:
+        """
+        Get text in a specific language.
+        Example: get_text_for("tr", "help.title")
+        """
+        messages = self._resolved.get(lang_code)
+        if messages is None:
+            messages = self._resolve(lang_code)
+        template = messages.get(key)
+        if template is None:
+            return f"Missing text: {key}"
         try:
-            # Split the key into parts (e.g., "help.title" -> ["help", "title"])
-            parts = key.split('.')
-            
-            # Navigate through the dictionary
-            text = self.languages[self.current_lang]
-            for part in parts:
-                text = text[part]
-            
-            # Format the text with provided kwargs
-            return text.format(**kwargs)
-        except (KeyError, AttributeError):
-            # Fallback to English if key not found in current language
-            try:
-                text = self.languages['en']
-                for part in parts:
-                    text = text[part]
-                return text.format(**kwargs)
-            except (KeyError, AttributeError):
-                return f"Missing text: {key}"
+            return template.render(kwargs)
+        except (KeyError, IndexError, AttributeError):
+            # The translation may use a placeholder the caller does not pass
+            fallback = self._resolve(self.fallback_lang).get(key)
+            if fallback is not None and fallback is not template:
+                try:
+                    return fallback.render(kwargs)
+                except (KeyError, IndexError, AttributeError):
+                    pass
+            return f"Missing text: {key}"
     
     def set_language(self, lang_code: str) -> bool:
-        """Change current language."""
-        if lang_code in self.languages:
+        """Change the bot-wide language."""
+        if lang_code in self._files:
             self.current_lang = lang_code
+            for listener in self._listeners:
+                listener(lang_code)
             return True
         return False
     
+    def add_listener(self, callback: Callable[[str], None]):
+        """
+        Register a callback that is called with a language code when the
+        default language changes or that language's file is reloaded.
+        """
+        self._listeners.append(callback)
+    
     def get_available_languages(self) -> Dict[str, str]:
-        """Get list of available languages with their native names."""
-        return {
-            'en': 'English',
-            'es': 'Español',
-            'tr': 'Türkçe'
-        }
+        """Get list of available languages with their native names (`language.name`)."""
+        languages = {}
+        for lang_code, path in self._files.items():
+            header = self._headers.get(lang_code)
+            if header is None:
+                try:
+                    header, _ = read_catalog(path, self._cache_path(lang_code), header_only=True)
+                except (OSError, yaml.YAMLError) as e:
+                    logger.warning("Failed to read language file {}: {}", path, e)
+                    continue
+                self._headers[lang_code] = header
+            languages[lang_code] = header.name
+        return languages
     
     def get_current_language(self) -> str:
         """Get current language code."""
+        return _context_lang.get() or self.current_lang
+    
+    def get_default_language(self) -> str:
+        """Get the bot-wide language, ignoring per-chat preferences."""
         return self.current_lang
 
 # Global instance
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from typing import Dict, Hashable, Optional, Tuple
+from loguru import logger
+
+# Preference scopes; a user's own preference wins over the chat's
+CHAT = 'chat'
+USER = 'user'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS locales (
+    scope TEXT NOT NULL,
+    id INTEGER NOT NULL,
+    lang TEXT NOT NULL,
+    PRIMARY KEY (scope, id)
+) WITHOUT ROWID
+"""
+
+class LocaleStore:
+    """
+    Per-chat and per-user language preferences.
+    The table holds one short row per chat or user that picked a language,
+    so it is read into memory once (`load()`, run off the event loop at
+    startup) and every lookup is a dict hit. Changes go to memory at once
+    and are written behind in batches, one transaction per `flush_delay`
+    window, off the event loop.
+    """
+
+    def __init__(self, path: str = "locales.db", flush_delay: float = 2.0):
+        self.path = path
+        self.flush_delay = flush_delay
+        self._langs: Optional[Dict[Tuple[str, Hashable], str]] = None
+        # Changes not yet handed to the writer
+        self._pending: Dict[Tuple[str, Hashable], Optional[str]] = {}
+        self._flush_handle = None
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(_SCHEMA)
+        connection.commit()
+        return connection
+
+    def load(self):
+        """Read every stored preference. Blocking; the first lookup calls it if nobody did."""
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            rows = self._writer.execute("SELECT scope, id, lang FROM locales").fetchall()
+        langs = {(scope, key): lang for scope, key, lang in rows}
+        if self._langs is not None:
+            # Changes made meanwhile are newer than the rows just read
+            langs.update(self._langs)
+        self._langs = langs
+
+    @property
+    def langs(self) -> Dict[Tuple[str, Hashable], str]:
+        if self._langs is None:
+            self.load()
+        return self._langs
+
+    def get(self, scope: str, key: Hashable) -> Optional[str]:
+        """Get the language stored for a chat or user, or None."""
+        return self.langs.get((scope, key))
+
+    def set(self, scope: str, key: Hashable, lang: Optional[str]):
+        """Store a preference; None clears it. Persisted on the next flush."""
+        cache_key = (scope, key)
+        if lang is None:
+            self.langs.pop(cache_key, None)
+        else:
+            self.langs[cache_key] = lang
+        self._pending[cache_key] = lang
+        if self._flush_handle is not None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.flush()
+            return
+        self._flush_handle = loop.call_later(self.flush_delay, self._flush_in_background, loop)
+
+    def resolve(self, chat_id: Hashable, user_id: Hashable = None) -> Optional[str]:
+        """Get the language for a message: the sender's preference, then the chat's."""
+        lang = self.get(USER, user_id) if user_id is not None else None
+        if lang is None and chat_id is not None:
+            lang = self.get(CHAT, chat_id)
+        return lang
+
+    def _flush_in_background(self, loop: asyncio.AbstractEventLoop):
+        self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if not batch:
+            return
+        future = loop.run_in_executor(None, self._write, batch)
+        future.add_done_callback(self._written)
+
+    def _written(self, future):
+        if not future.cancelled() and future.exception() is not None:
+            logger.error("Failed to save language preferences: {}", future.exception())
+
+    def _write(self, batch: Dict[Tuple[str, Hashable], Optional[str]]):
+        with self._write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            with self._writer:
+                self._writer.executemany(
+                    "INSERT OR REPLACE INTO locales (scope, id, lang) VALUES (?, ?, ?)",
+                    [(scope, key, lang) for (scope, key), lang in batch.items() if lang is not None]
+                )
+                self._writer.executemany(
+                    "DELETE FROM locales WHERE scope = ? AND id = ?",
+                    [cache_key for cache_key, lang in batch.items() if lang is None]
+                )
+
+    def flush(self):
+        """Write pending changes now, in the calling thread."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            self._write(batch)
+
+    def close(self):
+        """Flush pending changes and close the database."""
+        self.flush()
+        with self._write_lock:
+            if self._writer is not None:
+                self._writer.close()
+            self._writer = None
+
+# Global instance
+_locale_store = None
+
+def get_locale_store() -> LocaleStore:
+    global _locale_store
+    if _locale_store is None:
+        _locale_store = LocaleStore(os.getenv('LOCALE_DB', 'locales.db'))
+    return _locale_store
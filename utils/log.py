@@ -0,0 +1,49 @@
+import inspect
+import logging
+import sys
+from typing import Dict
+from loguru import logger
+
+class InterceptHandler(logging.Handler):
+    """Route stdlib `logging` records (commands, libraries) into loguru."""
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            level = logger.level(record.levelname).name
+        except ValueError:
+            level = record.levelno
+
+        # Find the caller outside of the logging module so file/line are right
+        frame, depth = inspect.currentframe(), 0
+        while frame and (depth == 0 or frame.f_code.co_filename == logging.__file__):
+            frame = frame.f_back
+            depth += 1
+
+        logger.opt(depth=depth, exception=record.exc_info).log(level, record.getMessage())
+
+def setup_logging(path: str = "bot.log", level: str = "INFO", json_logs: bool = False):
+    """
+    Configure the bot's logging.
+    All sinks are queue-backed (`enqueue=True`): records are handed to a
+    background thread, so file and console I/O never run on the event loop.
+    With `json_logs` the file sink writes one JSON object per record,
+    including fields bound with `logger.bind(...)`.
+    """
+    logger.remove()
+    logger.add(sys.stderr, level=level, enqueue=True)
+    logger.add(path, rotation="1 day", retention="7 days", level=level, enqueue=True, serialize=json_logs)
+
+    # Filter stdlib records at the source, before any message formatting
+    logging.basicConfig(handlers=[InterceptHandler()], level=logger.level(level).no, force=True)
+
+# Per-key event counters for sampled logging
+_sample_counts: Dict[str, int] = {}
+
+def sampled(key: str, every: int) -> bool:
+    """
+    Return True for the first and then every `every`-th event of `key`.
+    Example: if sampled("message", 100): logger.debug(...)
+    """
+    count = _sample_counts.get(key, 0)
+    _sample_counts[key] = count + 1
+    return count % every == 0
@@ -0,0 +1,145 @@
+import ast
+import json
+import os
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from loguru import logger
+
+MANIFEST_VERSION = 5
+
+# Module-level settings a command can declare, e.g. `timeout = 30`
+OPTION_NAMES = {'timeout', 'blocking', 'cache_ttl', 'sandbox'}
+
+class CommandInfo(NamedTuple):
+    """Static metadata of a command module, read without importing it."""
+    name: str
+    description: Optional[str]
+    usage: Optional[str]
+    aliases: List[str]
+    has_command: bool
+    options: Dict[str, Any]
+
+def parse_docstring(doc: Optional[str]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """Parse command docstring to extract name, description and usage."""
+    if not doc:
+        return None, None, None
+
+    lines = [line.strip() for line in doc.split('\n') if line.strip()]
+    name = ""
+    description = ""
+    usage = []
+
+    for line in lines:
+        if line.startswith('Command:'):
+            name = line.replace('Command:', '').strip()
+        elif line.startswith('Description:'):
+            description = line.replace('Description:', '').strip()
+        elif line.startswith('Usage:'):
+            # Single line form: "Usage: !ping"
+            rest = line.replace('Usage:', '').strip()
+            if rest.startswith('!'):
+                usage.append(rest)
+        elif line.startswith('!'):
+            usage.append(line)
+
+    return name, description, '\n'.join(usage) if usage else None
+
+def inspect_source(module_name: str, source: str) -> CommandInfo:
+    """
+    Read a command's metadata from its source with `ast`.
+    The `command` function docstring wins over the module docstring.
+    """
+    tree = ast.parse(source)
+    doc = None
+    aliases: List[str] = []
+    options: Dict[str, Any] = {}
+    has_command = False
+
+    for node in tree.body:
+        if isinstance(node, (ast.AsyncFunctionDef, ast.FunctionDef)) and node.name == 'command':
+            has_command = True
+            doc = ast.get_docstring(node)
+        elif isinstance(node, ast.Assign):
+            targets = [target.id for target in node.targets if isinstance(target, ast.Name)]
+            if 'aliases' not in targets and not OPTION_NAMES.intersection(targets):
+                continue
+            try:
+                value = ast.literal_eval(node.value)
+                if 'aliases' in targets:
+                    aliases = [value] if isinstance(value, str) else [str(alias) for alias in value]
+                for target in OPTION_NAMES.intersection(targets):
+                    options[target] = value
+            except (ValueError, TypeError):
+                continue
+
+    if not doc:
+        doc = ast.get_docstring(tree)
+    name, description, usage = parse_docstring(doc)
+    return CommandInfo(name or module_name, description or None, usage, aliases, has_command, options)
+
+class CommandManifest:
+    """
+    On-disk cache of CommandInfo keyed by module name and source file hash.
+    Unchanged command files are never parsed again across restarts.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._entries: Dict[str, CommandInfo] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != MANIFEST_VERSION:
+                return
+            self._entries = {key: CommandInfo(*entry) for key, entry in data['entries'].items()}
+        except FileNotFoundError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            logger.warning("Ignoring corrupt command manifest {}: {}", self.path, e)
+
+    @staticmethod
+    def _key(module_name: str, digest: str) -> str:
+        # The module name is part of the key because it is the fallback command name
+        return f"{module_name}:{digest}"
+
+    def get(self, module_name: str, digest: str, source_path: str) -> CommandInfo:
+        """Get command metadata, parsing the source only on a cache miss."""
+        key = self._key(module_name, digest)
+        info = self._entries.get(key)
+        if info is None:
+            with open(source_path, 'r', encoding='utf-8') as f:
+                info = inspect_source(module_name, f.read())
+            self._entries[key] = info
+            self._dirty = True
+        return info
+
+    def prune(self, live: Dict[str, str], stored: Iterable[Tuple[str, str]] = ()):
+        """
+        Forget entries for file versions that no longer exist (live: module -> digest).
+        `stored` (module, digest) pairs are kept too, e.g. versions that can be rolled back to.
+        """
+        keep = {self._key(module_name, digest) for module_name, digest in live.items()}
+        keep.update(self._key(module_name, digest) for module_name, digest in stored)
+        stale = [key for key in self._entries if key not in keep]
+        for key in stale:
+            del self._entries[key]
+        self._dirty = self._dirty or bool(stale)
+
+    def save(self):
+        """Write the manifest if it changed, atomically."""
+        if not self._dirty:
+            return
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': MANIFEST_VERSION,
+                    'entries': {key: list(info) for key, info in self._entries.items()},
+                }, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            logger.warning("Failed to write command manifest {}: {}", self.path, e)
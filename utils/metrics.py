@@ -0,0 +1,173 @@
+import bisect
+import math
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Fixed latency buckets in seconds, from a fast dict lookup to a slow plugin
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class _Metric:
+    type_name = 'untyped'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.type_name}"]
+
+class Counter(_Metric):
+    """
+    Monotonic counter. Updates are plain dict writes from the event loop
+    thread, readers take a snapshot, so no lock is needed.
+    """
+    type_name = 'counter'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+class Gauge(_Metric):
+    """Gauge that is either set explicitly or read from a callback at scrape time."""
+    type_name = 'gauge'
+
+    def __init__(self, name: str, documentation: str):
+        super().__init__(name, documentation)
+        self._value = 0.0
+        self._function: Optional[Callable[[], float]] = None
+
+    def set(self, value: float):
+        self._value = value
+
+    def set_function(self, function: Callable[[], float]):
+        self._function = function
+
+    def get(self) -> float:
+        return self._function() if self._function is not None else self._value
+
+    def render(self) -> List[str]:
+        return self.header() + [f"{self.name} {_format_value(self.get())}"]
+
+class Histogram(_Metric):
+    """Histogram with fixed buckets; observe() is a bisect and two list writes."""
+    type_name = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        counts = self._values.get(labels)
+        if counts is None:
+            counts = self._values[labels] = [0] * (len(self.buckets) + 2)
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        counts[-1] += value
+
+    def count(self, *labels: str) -> int:
+        counts = self._values.get(labels)
+        return int(sum(counts[:-1])) if counts else 0
+
+    def render(self) -> List[str]:
+        lines = self.header()
+        for labels, counts in sorted(self._values.items()):
+            counts = list(counts)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts[:-1]):
+                cumulative += count
+                bucket_labels = _labels(self.labelnames, labels, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {_format_value(cumulative)}")
+            label_text = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_text} {_format_value(counts[-1])}")
+            lines.append(f"{self.name}_count{label_text} {_format_value(cumulative)}")
+        return lines
+
+class MetricsRegistry:
+    """In-process metric registry rendered in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._register(Gauge(name, documentation))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+class BotMetrics:
+    """The userbot's metrics, updated by command_handler and load_commands."""
+
+    def __init__(self):
+        self.registry = MetricsRegistry()
+        r = self.registry
+        self.messages_seen = r.counter('userbot_messages_seen_total', 'Messages received by the handler')
+        self.commands_matched = r.counter('userbot_commands_matched_total', 'Messages that matched a registered command')
+        self.invocations = r.counter('userbot_command_invocations_total', 'Command invocations', ['command'])
+        self.errors = r.counter('userbot_command_errors_total', 'Command failures', ['command', 'reason'])
+        self.latency = r.histogram('userbot_command_latency_seconds', 'Command execution latency', ['command'])
+        self.queue_depth = r.gauge('userbot_handler_queue_depth', 'Commands waiting in the scheduler lanes')
+        self.running = r.gauge('userbot_handler_running', 'Commands currently executing')
+        self.queue_wait_avg = r.gauge('userbot_handler_queue_wait_avg_seconds', 'Mean time commands waited in their lane')
+        self.queue_wait_max = r.gauge('userbot_handler_queue_wait_max_seconds', 'Longest time a command waited in its lane')
+        self.cache_hits = r.counter('userbot_response_cache_hits_total', 'Replies served from the response cache')
+        self.cache_misses = r.counter('userbot_response_cache_misses_total', 'Cacheable replies that had to be computed')
+        self.reloads = r.counter('userbot_command_reloads_total', 'Command registry reloads')
+        self.reload_duration = r.histogram('userbot_command_reload_duration_seconds', 'Command registry reload time')
+
+    def render(self) -> str:
+        return self.registry.render()
+
+# Global instance
+_metrics = None
+
+def get_metrics() -> BotMetrics:
+    global _metrics
+    if _metrics is None:
+        _metrics = BotMetrics()
+    return _metrics
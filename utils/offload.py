@@ -0,0 +1,323 @@
+import asyncio
+import contextvars
+import importlib
+import inspect
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Container, Dict, Optional, Set
+from loguru import logger
+from utils.language import get_lang_manager, use_language
+from utils.plugin_store import get_plugin_store
+
+# Values handed to worker threads as-is instead of being proxied
+_PLAIN_TYPES = (str, bytes, int, float, bool, type(None), list, tuple, dict, set, frozenset)
+
+# Offload modes a command module can declare with `blocking = ...`
+THREAD = 'thread'
+PROCESS = 'process'
+# Declared with `sandbox = True`, or implied for installed commands (see CommandOffloader)
+SANDBOX = 'sandbox'
+
+def offload_mode(value: Any) -> Optional[str]:
+    """Normalize a module's `blocking` declaration to THREAD, PROCESS or None."""
+    if value is True or value == THREAD:
+        return THREAD
+    if value == PROCESS:
+        return PROCESS
+    return None
+
+class LoopProxy:
+    """
+    Thread-safe view of an object owned by the event loop.
+    Attribute reads happen in the calling thread. Method calls are marshalled
+    onto the owning loop: coroutine methods return an awaitable for the
+    worker's own loop, plain methods block the worker thread until done.
+    """
+    __slots__ = ('_target', '_loop')
+
+    def __init__(self, target: Any, loop: asyncio.AbstractEventLoop):
+        object.__setattr__(self, '_target', target)
+        object.__setattr__(self, '_loop', loop)
+
+    def __getattr__(self, name: str) -> Any:
+        return _wrap(getattr(self._target, name), self._loop)
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError("LoopProxy is read-only")
+
+    def __bool__(self):
+        return bool(self._target)
+
+    def __str__(self):
+        return str(self._target)
+
+def _wrap(value: Any, loop: asyncio.AbstractEventLoop) -> Any:
+    if isinstance(value, _PLAIN_TYPES):
+        return value
+    if inspect.iscoroutinefunction(value):
+        return _async_call(value, loop)
+    if inspect.ismethod(value) or inspect.isfunction(value):
+        return _sync_call(value, loop)
+    return LoopProxy(value, loop)
+
+def _async_call(func, loop: asyncio.AbstractEventLoop):
+    async def call(*args, **kwargs):
+        future = asyncio.run_coroutine_threadsafe(func(*args, **kwargs), loop)
+        return _wrap(await asyncio.wrap_future(future), loop)
+    return call
+
+def _sync_call(func, loop: asyncio.AbstractEventLoop):
+    def call(*args, **kwargs):
+        async def run():
+            return func(*args, **kwargs)
+        return _wrap(asyncio.run_coroutine_threadsafe(run(), loop).result(), loop)
+    return call
+
+class EventSnapshot:
+    """Picklable view of a Telethon event for commands running in a worker process."""
+
+    def __init__(self, event):
+        message = getattr(event, 'message', None)
+        self.chat_id = getattr(event, 'chat_id', None)
+        self.sender_id = getattr(event, 'sender_id', None)
+        self.message_id = getattr(message, 'id', None)
+        self.text = getattr(message, 'text', None)
+        self.is_reply = bool(getattr(message, 'is_reply', False))
+        self.is_private = bool(getattr(event, 'is_private', False))
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.__dict__)
+
+    @classmethod
+    def from_dict(cls, fields: Dict[str, Any]) -> 'EventSnapshot':
+        snapshot = cls.__new__(cls)
+        snapshot.__dict__.update(fields)
+        return snapshot
+
+def _run_in_thread(func, event, args):
+    return asyncio.run(func(event, args))
+
+def _init_process(paths):
+    for path in reversed(paths):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+def load_command(module_name: str, digest: Optional[str] = None):
+    """
+    Load a command function in a worker process: the plugin store's cached
+    code object for `digest` if it has one, else a fresh import of the file.
+    """
+    code = get_plugin_store().code_for(digest) if digest else None
+    if code is None:
+        sys.modules.pop(module_name, None)
+        importlib.invalidate_caches()
+        return importlib.import_module(module_name).command
+    module = type(sys)(module_name)
+    module.__file__ = code.co_filename
+    sys.modules[module_name] = module
+    exec(code, module.__dict__)
+    return module.command
+
+# Commands loaded by this pool worker, by (module name, digest)
+_process_commands: Dict[tuple, Any] = {}
+
+def _run_in_process(module_name: str, digest: Optional[str], snapshot: EventSnapshot, args, lang=None):
+    use_language(lang)
+    # A reloaded file or another stored version has a new digest and is loaded again
+    key = (module_name, digest)
+    command = _process_commands.get(key)
+    if command is None:
+        for old_key in [old_key for old_key in _process_commands if old_key[0] == module_name]:
+            del _process_commands[old_key]
+        command = _process_commands[key] = load_command(module_name, digest)
+    return asyncio.run(command(snapshot, args))
+
+class _MeasuredCoroutine:
+    """Awaitable that times every synchronous slice of the wrapped coroutine."""
+    __slots__ = ('_coro', 'max_slice', 'slow_slices', '_threshold')
+
+    def __init__(self, coro, threshold: float):
+        self._coro = coro
+        self._threshold = threshold
+        self.max_slice = 0.0
+        self.slow_slices = 0
+
+    def _record(self, elapsed: float):
+        if elapsed > self.max_slice:
+            self.max_slice = elapsed
+        if elapsed >= self._threshold:
+            self.slow_slices += 1
+
+    def __await__(self):
+        coro = self._coro
+        value, error = None, None
+        while True:
+            start = time.perf_counter()
+            try:
+                if error is None:
+                    yielded = coro.send(value)
+                else:
+                    yielded = coro.throw(error)
+            except StopIteration as e:
+                self._record(time.perf_counter() - start)
+                return e.value
+            except BaseException:
+                self._record(time.perf_counter() - start)
+                raise
+            self._record(time.perf_counter() - start)
+            try:
+                value, error = (yield yielded), None
+            except BaseException as e:
+                value, error = None, e
+
+class StallMonitor:
+    """
+    Detects commands that block the event loop.
+    Every in-loop invocation is timed per synchronous slice (the code that
+    runs between two awaits). A slice longer than `threshold` seconds stalls
+    every other chat, and the command gets flagged.
+    """
+
+    def __init__(self, threshold: float = 0.1):
+        self.threshold = threshold
+        self.flagged: Set[str] = set()
+        self.max_stall: Dict[str, float] = {}
+        self.stalls: Dict[str, int] = {}
+
+    async def run(self, command_name: str, coro):
+        measured = _MeasuredCoroutine(coro, self.threshold)
+        try:
+            return await measured
+        finally:
+            if measured.max_slice > self.max_stall.get(command_name, 0.0):
+                self.max_stall[command_name] = measured.max_slice
+            if measured.slow_slices:
+                self.stalls[command_name] = self.stalls.get(command_name, 0) + measured.slow_slices
+                if command_name not in self.flagged:
+                    self.flagged.add(command_name)
+                    logger.warning(
+                        "Command {} blocked the event loop for {:.0f}ms; consider declaring `blocking = True`",
+                        command_name, measured.max_slice * 1000
+                    )
+
+class CommandOffloader:
+    """
+    Runs commands on the event loop, a bounded thread pool or a process pool.
+    Modules opt in with `blocking = True` (or 'thread') for blocking I/O and
+    `blocking = 'process'` for CPU-bound work. In thread mode the event is
+    wrapped in a LoopProxy so Telethon calls still run on the main loop; in
+    process mode the command receives an EventSnapshot and cannot call
+    Telethon at all. With `auto_offload`, commands flagged by the
+    StallMonitor are moved to the thread pool on their next invocation.
+    Given a SandboxPool, commands declaring `sandbox = True` (and with
+    `sandbox_installed`, every command installed from the plugin store) run
+    in rlimited worker processes and are never imported by the bot itself.
+    Commands named in `untrusted` always go to the sandbox.
+    """
+
+    def __init__(self, max_threads: int = 4, max_processes: int = 2,
+                 stall_threshold: float = 0.1, auto_offload: bool = False,
+                 worker_paths: Optional[list] = None, sandbox=None, sandbox_installed: bool = False):
+        self.max_threads = max_threads
+        self.max_processes = max_processes
+        self.auto_offload = auto_offload
+        self.worker_paths = worker_paths or list(sys.path)
+        self.monitor = StallMonitor(stall_threshold)
+        self.sandbox = sandbox
+        self.sandbox_installed = sandbox_installed
+        self.untrusted: Container[str] = ()
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def mode_for(self, command_name: str, command) -> Optional[str]:
+        """Get the offload mode of a command, or None to run it on the loop."""
+        option = getattr(command, 'option', None)
+        if self.sandbox is not None and self._sandboxed(command, option):
+            return SANDBOX
+        mode = offload_mode(option('blocking') if option else getattr(command, 'blocking', None))
+        if mode is None and self.auto_offload and command_name in self.monitor.flagged:
+            mode = THREAD
+        return mode
+
+    def _sandboxed(self, command, option) -> bool:
+        if option and option('sandbox'):
+            return True
+        if getattr(command, 'module_name', None) in self.untrusted:
+            return True
+        # Built-in commands are trusted; only versions from the plugin store were installed by users
+        digest = getattr(command, 'digest', None)
+        return self.sandbox_installed and digest is not None and get_plugin_store().has(digest)
+
+    async def run(self, command_name: str, command, event, args):
+        """Invoke a command in the mode it declared and return its result."""
+        mode = self.mode_for(command_name, command)
+        if mode is None:
+            return await self.monitor.run(command_name, command(event, args))
+
+        if mode == SANDBOX:
+            logger.debug("Running {} in sandbox", command_name)
+            return await self.sandbox.run(
+                getattr(command, 'module_name', command_name), getattr(command, 'digest', None),
+                EventSnapshot(event), args, get_lang_manager().get_current_language()
+            )
+
+        loop = asyncio.get_running_loop()
+        if mode == PROCESS:
+            # Imported by the worker process only, never by the bot itself
+            module_name = getattr(command, 'module_name', None) or command.__module__
+            if self._processes is None:
+                # Spawned, not forked: forking would copy the bot's threads mid-state
+                self._processes = ProcessPoolExecutor(
+                    max_workers=self.max_processes,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_process,
+                    initargs=([os.path.abspath(path) for path in self.worker_paths],)
+                )
+            logger.debug("Running {} in process pool", command_name)
+            return await loop.run_in_executor(
+                self._processes, _run_in_process, module_name, getattr(command, 'digest', None),
+                EventSnapshot(event), args, get_lang_manager().get_current_language()
+            )
+
+        # Import lazily loaded commands on the loop thread, never in a worker
+        func = command.load() if hasattr(command, 'load') else command
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_threads, thread_name_prefix='command')
+        logger.debug("Running {} in thread pool", command_name)
+        # Carry context variables (e.g. the chat's language) into the worker thread
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._threads, context.run, _run_in_thread, func, LoopProxy(event, loop), args
+        )
+
+    def warm_up(self, commands: Dict[str, Any]) -> int:
+        """
+        Import the thread-mode commands ahead of their first call, which
+        otherwise imports them (e.g. Flask and pymongo for account_creator)
+        on the loop thread. Commands reloaded later import on first call
+        again. Returns the number of modules imported.
+        """
+        imported = 0
+        for command_name, command in commands.items():
+            if getattr(command, 'loaded', True) or self.mode_for(command_name, command) != THREAD:
+                continue
+            try:
+                command.load()
+                imported += 1
+            except Exception as e:
+                logger.warning("Failed to preload command {}: {}", command_name, e)
+        return imported
+
+    def shutdown(self):
+        """Shut down worker pools without waiting for running commands."""
+        if self._threads is not None:
+            self._threads.shutdown(wait=False, cancel_futures=True)
+            self._threads = None
+        if self._processes is not None:
+            self._processes.shutdown(wait=False, cancel_futures=True)
+            self._processes = None
+        if self.sandbox is not None:
+            self.sandbox.shutdown()
@@ -0,0 +1,144 @@
+import asyncio
+import io
+import time
+from collections import OrderedDict
+from typing import Hashable, List
+from loguru import logger
+from telethon.errors import FloodWaitError
+
+# Telegram rejects text messages longer than this
+MESSAGE_LIMIT = 4096
+
+def split_message(text: str, limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    Split text into chunks of at most `limit` characters.
+    Splits on line boundaries and only cuts inside a line that is itself too long.
+    """
+    if len(text) <= limit:
+        return [text]
+
+    chunks = []
+    current = ''
+    for line in text.splitlines(keepends=True):
+        if len(current) + len(line) <= limit:
+            current += line
+            continue
+        if current:
+            chunks.append(current)
+            current = ''
+        while len(line) > limit:
+            chunks.append(line[:limit])
+            line = line[limit:]
+        current = line
+    if current:
+        chunks.append(current)
+    # Trailing newlines at the cut points would be sent as empty-looking messages
+    return [chunk.rstrip('\n') for chunk in chunks if chunk.strip()]
+
+class TokenBucket:
+    """Token bucket rate limiter; acquire() waits until a token is available."""
+
+    def __init__(self, rate: float, capacity: float, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._blocked_until = 0.0
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def reserve(self) -> float:
+        """Take a token and return how long the caller must wait before using it."""
+        now = self.clock()
+        self._refill(now)
+        self._tokens -= 1
+        wait = 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+        return max(wait, self._blocked_until - now)
+
+    def block(self, seconds: float):
+        """Hold every holder of this bucket back, e.g. after a FloodWait."""
+        self._blocked_until = max(self._blocked_until, self.clock() + seconds)
+
+    @property
+    def blocked(self) -> bool:
+        return self._blocked_until > self.clock()
+
+    async def acquire(self):
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+class OutboundSender:
+    """
+    Rate-limited reply delivery.
+    Every message passes a per-chat and a global token bucket, FloodWait
+    errors are slept off and retried, long outputs are split on line
+    boundaries and very long outputs are uploaded as a text document.
+    """
+
+    def __init__(self, chat_rate: float = 1.0, chat_burst: float = 3, global_rate: float = 25.0,
+                 global_burst: float = 30, max_chunks: int = 4, max_retries: int = 3,
+                 max_flood_wait: float = 300, max_chats: int = 4096):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_chunks = max_chunks
+        self.max_retries = max_retries
+        self.max_flood_wait = max_flood_wait
+        self.max_chats = max_chats
+        self.global_bucket = TokenBucket(global_rate, global_burst)
+        self._chat_buckets: 'OrderedDict[Hashable, TokenBucket]' = OrderedDict()
+        self.flood_waits = 0
+
+    def _chat_bucket(self, chat_id: Hashable) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+            # Forget the least recently used chats, a fresh bucket starts full anyway
+            while len(self._chat_buckets) > self.max_chats:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    async def reply(self, event, text: str, filename: str = 'output.txt'):
+        """Reply to an event with text, splitting or uploading it as needed."""
+        chunks = split_message(text)
+        if len(chunks) > self.max_chunks:
+            caption = chunks[0][:200].split('\n', 1)[0]
+            await self._send(event, lambda: event.reply(caption, file=self._document(text, filename)))
+            return
+        for chunk in chunks:
+            await self._send(event, lambda chunk=chunk: event.reply(chunk))
+
+    def blocked(self, chat_id: Hashable) -> bool:
+        """Check whether replies to a chat are held back by a FloodWait."""
+        bucket = self._chat_buckets.get(chat_id)
+        return self.global_bucket.blocked or (bucket is not None and bucket.blocked)
+
+    @staticmethod
+    def _document(text: str, filename: str) -> io.BytesIO:
+        # A fresh buffer per attempt, a retried upload must start at offset 0
+        document = io.BytesIO(text.encode('utf-8'))
+        document.name = filename
+        return document
+
+    async def _send(self, event, send, attempt: int = 0):
+        bucket = self._chat_bucket(getattr(event, 'chat_id', None))
+        await bucket.acquire()
+        await self.global_bucket.acquire()
+        try:
+            return await send()
+        except FloodWaitError as e:
+            self.flood_waits += 1
+            if attempt >= self.max_retries or e.seconds > self.max_flood_wait:
+                logger.error("Giving up on reply after FloodWait of {}s (attempt {})", e.seconds, attempt + 1)
+                raise
+            logger.warning("FloodWait: sleeping {}s before retrying reply", e.seconds)
+            # FloodWait on sending applies to the whole account, not just this chat
+            bucket.block(e.seconds)
+            self.global_bucket.block(e.seconds)
+            await asyncio.sleep(e.seconds)
+            return await self._send(event, send, attempt + 1)
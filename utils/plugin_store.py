@@ -0,0 +1,184 @@
+import hashlib
+import importlib.util
+import json
+import marshal
+import os
+import threading
+import time
+from types import CodeType
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from loguru import logger
+
+STORE_VERSION = 1
+
+class PluginVersion(NamedTuple):
+    digest: str
+    installed: float
+    active: bool
+
+class PluginStore:
+    """
+    Content-addressed history of installed commands.
+    Every version is kept as objects/<sha256>.py next to its compiled code
+    object (objects/<sha256>.code, marshal with the interpreter's magic
+    number). refs.json holds each command's version history and an
+    active-version pointer; the active source is copied into the commands
+    directory so the registry sees it like any other command file.
+    Refs are changed from executor threads, so every access holds `_lock`.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+        self.objects_dir = os.path.join(root, 'objects')
+        self.refs_path = os.path.join(root, 'refs.json')
+        self._refs: Optional[Dict[str, Dict]] = None
+        self._code: Dict[str, CodeType] = {}
+        self._lock = threading.RLock()
+
+    @property
+    def refs(self) -> Dict[str, Dict]:
+        if self._refs is None:
+            try:
+                with open(self.refs_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._refs = data['commands'] if data.get('version') == STORE_VERSION else {}
+            except (OSError, ValueError, KeyError):
+                self._refs = {}
+        return self._refs
+
+    def _save_refs(self):
+        tmp_path = f"{self.refs_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STORE_VERSION, 'commands': self.refs}, f)
+        os.replace(tmp_path, self.refs_path)
+
+    def _object_path(self, digest: str, suffix: str) -> str:
+        return os.path.join(self.objects_dir, digest + suffix)
+
+    def add(self, module_name: str, source: bytes, digest: Optional[str] = None) -> str:
+        """Store a version of a command (source and compiled code); returns its digest."""
+        digest = digest or hashlib.sha256(source).hexdigest()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        source_path = self._object_path(digest, '.py')
+        if not os.path.exists(source_path):
+            _write_atomic(source_path, source)
+        if not os.path.exists(self._object_path(digest, '.code')):
+            self._compile(digest, source)
+
+        with self._lock:
+            entry = self.refs.setdefault(module_name, {'active': None, 'history': []})
+            if all(version['digest'] != digest for version in entry['history']):
+                entry['history'].append({'digest': digest, 'installed': time.time()})
+            self._save_refs()
+        return digest
+
+    def _compile(self, digest: str, source: bytes) -> CodeType:
+        code = compile(source, self._object_path(digest, '.py'), 'exec', dont_inherit=True)
+        _write_atomic(self._object_path(digest, '.code'), importlib.util.MAGIC_NUMBER + marshal.dumps(code))
+        self._code[digest] = code
+        return code
+
+    def code_for(self, digest: str) -> Optional[CodeType]:
+        """Get the compiled code of a stored version, or None if it is not in the store."""
+        code = self._code.get(digest)
+        if code is not None:
+            return code
+        try:
+            with open(self._object_path(digest, '.code'), 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        magic = importlib.util.MAGIC_NUMBER
+        if data[:len(magic)] == magic:
+            code = self._code[digest] = marshal.loads(data[len(magic):])
+            return code
+        # Written by another Python version, compile once more
+        try:
+            with open(self._object_path(digest, '.py'), 'rb') as f:
+                return self._compile(digest, f.read())
+        except (OSError, SyntaxError, ValueError) as e:
+            logger.warning("Failed to recompile stored plugin {}: {}", digest[:12], e)
+            return None
+
+    def has(self, digest: str) -> bool:
+        """Check whether a version is in the store."""
+        return digest in self._code or os.path.exists(self._object_path(digest, '.code'))
+
+    def activate(self, module_name: str, digest: str, commands_dir: str) -> str:
+        """Point a command at a stored version and place its source in `commands_dir`."""
+        with self._lock:
+            entry = self.refs.get(module_name)
+            if entry is None or all(version['digest'] != digest for version in entry['history']):
+                raise KeyError(f"{module_name} has no stored version {digest[:12]}")
+            with open(self._object_path(digest, '.py'), 'rb') as f:
+                source = f.read()
+            path = os.path.join(commands_dir, module_name + '.py')
+            _write_atomic(path, source)
+            entry['active'] = digest
+            self._save_refs()
+        logger.info("Activated {} version {}", module_name, digest[:12])
+        return path
+
+    def deactivate(self, module_name: str, commands_dir: str):
+        """Remove a command from `commands_dir`, keeping its versions in the store."""
+        with self._lock:
+            path = os.path.join(commands_dir, module_name + '.py')
+            if os.path.exists(path):
+                os.remove(path)
+            entry = self.refs.get(module_name)
+            if entry is not None and entry['active'] is not None:
+                # What a plain rollback restores
+                entry['removed'] = entry['active']
+                entry['active'] = None
+                self._save_refs()
+
+    def versions(self, module_name: str) -> List[PluginVersion]:
+        """Stored versions of a command, oldest first."""
+        with self._lock:
+            entry = self.refs.get(module_name) or {'active': None, 'history': []}
+            return [
+                PluginVersion(version['digest'], version['installed'], version['digest'] == entry['active'])
+                for version in entry['history']
+            ]
+
+    def stored(self) -> List[Tuple[str, str]]:
+        """Every (command, digest) version in the store."""
+        with self._lock:
+            return [
+                (module_name, version['digest'])
+                for module_name, entry in self.refs.items() for version in entry['history']
+            ]
+
+    def find(self, module_name: str, version: Optional[str] = None) -> Optional[str]:
+        """
+        Resolve a version of a command: a unique digest prefix, or with no
+        `version` the one installed before the active one (after `!cmd remove`,
+        the one that was removed).
+        """
+        versions = self.versions(module_name)
+        if version:
+            matches = [v.digest for v in versions if v.digest.startswith(version.lower())]
+            return matches[0] if len(matches) == 1 else None
+        with self._lock:
+            entry = self.refs.get(module_name)
+            if entry is not None and entry['active'] is None:
+                return entry.get('removed')
+        active = [i for i, v in enumerate(versions) if v.active]
+        if active and active[0] > 0:
+            return versions[active[0] - 1].digest
+        return None
+
+def _write_atomic(path: str, data: bytes):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+# Global instance
+_plugin_store = None
+
+def get_plugin_store() -> PluginStore:
+    global _plugin_store
+    if _plugin_store is None:
+        _plugin_store = PluginStore(os.getenv('PLUGIN_STORE', '.plugin_store'))
+    return _plugin_store
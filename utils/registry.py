@@ -0,0 +1,219 @@
+import hashlib
+import importlib
+import os
+import sys
+import types
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+from loguru import logger
+from utils.manifest import CommandInfo, CommandManifest
+from utils.plugin_store import get_plugin_store
+
+class FileState(NamedTuple):
+    mtime_ns: int
+    size: int
+    digest: str
+
+class ReloadResult(NamedTuple):
+    added: List[str]
+    changed: List[str]
+    removed: List[str]
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+def is_command_file(filename: str) -> bool:
+    """Check if a file in the commands directory is a command module."""
+    return filename.endswith('.py') and not filename.startswith('_')
+
+def file_digest(path: str) -> str:
+    """Get the sha256 hex digest of a file."""
+    with open(path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+class LazyCommand:
+    """
+    Stand-in for a command function that imports its module on first call.
+    Metadata (name, description, usage, aliases) is available without importing.
+    """
+
+    def __init__(self, module_name: str, info: CommandInfo, digest: Optional[str] = None):
+        self.module_name = module_name
+        self.info = info
+        self.digest = digest
+        self._func: Optional[Callable] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._func is not None
+
+    def option(self, name: str, default: Any = None) -> Any:
+        """Get a module-level setting declared by the command (see manifest.OPTION_NAMES)."""
+        return self.info.options.get(name, default)
+
+    def load(self) -> Callable:
+        """Import the command module and return its command function."""
+        if self._func is None:
+            logger.info("Importing command module: {}", self.module_name)
+            # Remove the module if it's already loaded
+            sys.modules.pop(self.module_name, None)
+            # Versions from the plugin store run their cached code object, no compile
+            code = get_plugin_store().code_for(self.digest) if self.digest else None
+            if code is not None:
+                module = types.ModuleType(self.module_name)
+                module.__file__ = code.co_filename
+                sys.modules[self.module_name] = module
+                try:
+                    exec(code, module.__dict__)
+                except BaseException:
+                    sys.modules.pop(self.module_name, None)
+                    raise
+            else:
+                importlib.invalidate_caches()
+                module = importlib.import_module(self.module_name)
+            func = getattr(module, 'command', None)
+            if func is None:
+                raise AttributeError(f"Module {self.module_name} does not have a command function")
+            self._func = func
+        return self._func
+
+    def unload(self):
+        """Drop the imported module so the next call imports it afresh."""
+        self._func = None
+        sys.modules.pop(self.module_name, None)
+
+    async def __call__(self, event, args):
+        func = self._func or self.load()
+        return await func(event, args)
+
+class CommandRegistry:
+    """
+    Incrementally and lazily loaded registry of command modules.
+    refresh() compares the commands directory against the last snapshot and
+    only re-inspects files that were added, changed or removed. Metadata is
+    read with `ast` (cached in a manifest keyed by file hash) and modules are
+    imported on the first invocation of their command. The public `commands`,
+    `aliases` and `info` dicts are replaced, never mutated, so callers holding
+    a reference always see a complete registry.
+    """
+
+    def __init__(self, commands_dir: str, manifest_path: Optional[str] = None):
+        self.commands_dir = commands_dir
+        self.commands: Dict[str, LazyCommand] = {}
+        self.aliases: Dict[str, List[str]] = {}
+        self.info: Dict[str, CommandInfo] = {}
+        self.manifest = CommandManifest(manifest_path or os.path.join(commands_dir, '.manifest.json'))
+        self._files: Dict[str, FileState] = {}
+
+    def _scan(self) -> Dict[str, os.stat_result]:
+        """Stat every command file without reading it."""
+        stats = {}
+        with os.scandir(self.commands_dir) as entries:
+            for entry in entries:
+                if is_command_file(entry.name) and entry.is_file():
+                    stats[entry.name[:-3]] = entry.stat()
+        return stats
+
+    def _ensure_path(self):
+        if not os.path.exists(self.commands_dir):
+            os.makedirs(self.commands_dir)
+        if self.commands_dir not in sys.path:
+            sys.path.insert(0, self.commands_dir)
+
+    def refresh(self) -> ReloadResult:
+        """Register added and changed modules and drop removed ones."""
+        self._ensure_path()
+        stats = self._scan()
+
+        added, changed = [], []
+        files = {}
+        for module_name, st in stats.items():
+            old = self._files.get(module_name)
+            if old is not None and old.mtime_ns == st.st_mtime_ns and old.size == st.st_size:
+                files[module_name] = old
+                continue
+
+            # Only hash files whose stat changed, a plain touch is not a change
+            path = os.path.join(self.commands_dir, module_name + '.py')
+            try:
+                digest = file_digest(path)
+            except OSError as e:
+                logger.error("Failed to read command {}: {}", module_name, e)
+                continue
+            files[module_name] = FileState(st.st_mtime_ns, st.st_size, digest)
+            if old is None:
+                added.append(module_name)
+            elif old.digest != digest:
+                changed.append(module_name)
+
+        removed = [name for name in self._files if name not in stats]
+        self._files = files
+        result = ReloadResult(sorted(added), sorted(changed), sorted(removed))
+        if result:
+            self._apply(result)
+        return result
+
+    def register(self, module_name: str, digest: Optional[str] = None) -> ReloadResult:
+        """
+        Register one new or changed command file without scanning the directory,
+        or drop it if the file is gone. Pass `digest` if the caller already hashed the content.
+        """
+        self._ensure_path()
+        path = os.path.join(self.commands_dir, module_name + '.py')
+        if not os.path.exists(path):
+            if module_name not in self._files:
+                return ReloadResult([], [], [])
+            self._files = {name: state for name, state in self._files.items() if name != module_name}
+            result = ReloadResult([], [], [module_name])
+            self._apply(result)
+            return result
+        st = os.stat(path)
+        if digest is None:
+            digest = file_digest(path)
+
+        old = self._files.get(module_name)
+        self._files = {**self._files, module_name: FileState(st.st_mtime_ns, st.st_size, digest)}
+        if old is not None and old.digest == digest:
+            return ReloadResult([], [], [])
+        result = ReloadResult([] if old else [module_name], [module_name] if old else [], [])
+        self._apply(result)
+        return result
+
+    def _apply(self, result: ReloadResult):
+        """Update the registry for a reload result, based on the current file snapshot."""
+        files = self._files
+        commands = dict(self.commands)
+        aliases = dict(self.aliases)
+        info = dict(self.info)
+        for module_name in result.removed + result.changed:
+            old_command = commands.pop(module_name, None)
+            aliases.pop(module_name, None)
+            info.pop(module_name, None)
+            if old_command is not None:
+                old_command.unload()
+            else:
+                sys.modules.pop(module_name, None)
+            if module_name in result.removed:
+                logger.info("Unloaded command: {}", module_name)
+
+        for module_name in result.added + result.changed:
+            path = os.path.join(self.commands_dir, module_name + '.py')
+            try:
+                command_info = self.manifest.get(module_name, files[module_name].digest, path)
+            except Exception as e:
+                logger.error("Failed to load command {}: {}", module_name, e)
+                continue
+            if not command_info.has_command:
+                logger.warning("Module {} does not have a command function", module_name)
+                continue
+            commands[module_name] = LazyCommand(module_name, command_info, files[module_name].digest)
+            aliases[module_name] = command_info.aliases
+            info[module_name] = command_info
+            logger.info("Registered command: {}", module_name)
+
+        self.manifest.prune(
+            {name: state.digest for name, state in files.items()}, get_plugin_store().stored()
+        )
+        self.manifest.save()
+
+        # Swap in the new registry in one step
+        self.commands, self.aliases, self.info = commands, aliases, info
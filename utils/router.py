@@ -0,0 +1,122 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# One alternative per segment kind: whitespace, bare run, "double", 'single', stray quote
+_PART_RE = re.compile(r"""(\s+)|([^\s"']+)|"((?:\\.|[^"\\])*)"|'([^']*)'|(.)""", re.S)
+_ESCAPE_RE = re.compile(r'\\(.)')
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split command text into arguments, honouring quotes.
+    Example: tokenize('echo "hello world" !') -> ['echo', 'hello world', '!']
+    """
+    # Fast path: plain whitespace split when there is nothing to unquote
+    if '"' not in text and "'" not in text:
+        return text.split()
+
+    tokens = []
+    current = None
+    for space, bare, double, single, stray in _PART_RE.findall(text):
+        if space:
+            if current is not None:
+                tokens.append(current)
+                current = None
+            continue
+        if stray:
+            # Unbalanced quotes, fall back to a plain split
+            return text.split()
+        if bare or single:
+            part = bare or single
+        else:
+            part = _ESCAPE_RE.sub(r'\1', double) if '\\' in double else double
+        current = part if current is None else current + part
+
+    if current is not None:
+        tokens.append(current)
+    return tokens
+
+class CommandRouter:
+    """
+    Resolves prefixed messages to registered commands.
+    The lookup table maps every command name and alias to its canonical
+    command name and is only rebuilt when the registry changes.
+    """
+
+    def __init__(self, prefix: str = '!'):
+        if not prefix:
+            raise ValueError("Command prefix must not be empty")
+        self.prefix = prefix
+        self._first_char = prefix[0]
+        self._prefix_len = len(prefix)
+        self._table: Dict[str, str] = {}
+        self.version = 0
+
+    def rebuild(self, commands: Iterable[str], aliases: Optional[Dict[str, Iterable[str]]] = None):
+        """
+        Rebuild the lookup table from command names and their aliases.
+        Command names always win over aliases of other commands.
+        """
+        table: Dict[str, str] = {}
+        for name, names in (aliases or {}).items():
+            for alias in names:
+                table.setdefault(alias.lower(), name)
+        for name in commands:
+            table[name.lower()] = name
+
+        # Swap the table in one assignment so readers never see a partial one
+        self._table = table
+        self.version += 1
+
+    def resolve(self, name: str) -> Optional[str]:
+        """Resolve a command name or alias to its canonical command name."""
+        return self._table.get(name.lower())
+
+    def names(self) -> List[str]:
+        """Get every routable name, including aliases."""
+        return list(self._table)
+
+    def table(self) -> Dict[str, str]:
+        """Get a copy of the name/alias -> command lookup table."""
+        return dict(self._table)
+
+    def parse(self, text: Optional[str]) -> Optional[Tuple[str, List[str]]]:
+        """
+        Parse a message into (command_name, args).
+        Returns None for non-prefixed text or empty commands.
+        """
+        if not text or text[0] != self._first_char:
+            return None
+        if self._prefix_len > 1 and not text.startswith(self.prefix):
+            return None
+
+        tokens = tokenize(text[self._prefix_len:])
+        if not tokens:
+            return None
+        return tokens[0].lower(), tokens[1:]
+
+    def route(self, text: Optional[str]) -> Optional[Tuple[str, str, List[str]]]:
+        """
+        Route a message to a registered command.
+        Returns (canonical_name, invoked_name, args) or None if the message
+        is not a command. canonical_name is None for unknown commands.
+        """
+        # Inlined parse(): this runs for every incoming message
+        if not text or text[0] != self._first_char:
+            return None
+        if self._prefix_len > 1 and not text.startswith(self.prefix):
+            return None
+
+        tokens = tokenize(text[self._prefix_len:])
+        if not tokens:
+            return None
+        invoked = tokens[0].lower()
+        return self._table.get(invoked), invoked, tokens[1:]
+
+def collect_aliases(module) -> List[str]:
+    """Read the optional `aliases` attribute of a command module."""
+    aliases = getattr(module, 'aliases', None)
+    if not aliases:
+        return []
+    if isinstance(aliases, str):
+        return [aliases]
+    return [str(alias) for alias in aliases]
@@ -0,0 +1,185 @@
+import asyncio
+import marshal
+import multiprocessing
+import os
+import resource
+import signal
+import sys
+from multiprocessing.connection import Connection
+from typing import Any, Dict, List, Optional, Set
+from loguru import logger
+from utils.language import use_language
+from utils.offload import EventSnapshot, load_command
+
+class SandboxError(Exception):
+    """A sandboxed command failed: it raised, hit a resource limit or killed its worker."""
+
+def _worker_main(conn: Connection, paths: List[str], cpu_seconds: int, max_calls: int, memory_bytes: int):
+    """
+    Worker process loop. Requests and replies are marshal-encoded tuples:
+    (module_name, digest, args, event fields, lang) -> (ok, result or error, peak RSS in KB).
+    """
+    for path in reversed(paths):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    if memory_bytes:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+    # The hard CPU limit covers the worker's whole life; the soft one is moved per call
+    resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds * (max_calls + 1)))
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    loop = asyncio.new_event_loop()
+    commands: Dict[tuple, Any] = {}
+    while True:
+        try:
+            request = conn.recv_bytes()
+        except (EOFError, OSError):
+            loop.close()
+            return
+        module_name, digest, args, fields, lang = marshal.loads(request)
+
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        used = int(usage.ru_utime + usage.ru_stime) + 1
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        resource.setrlimit(resource.RLIMIT_CPU, (min(used + cpu_seconds, hard), hard))
+
+        try:
+            key = (module_name, digest)
+            if key not in commands:
+                commands[key] = load_command(module_name, digest)
+            use_language(lang)
+            result = loop.run_until_complete(commands[key](EventSnapshot.from_dict(fields), args))
+            reply = marshal.dumps((True, result, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+        except MemoryError:
+            reply = marshal.dumps((False, "memory limit exceeded", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+        except Exception as e:
+            reply = marshal.dumps((False, f"{type(e).__name__}: {e}", resource.getrusage(resource.RUSAGE_SELF).ru_maxrss))
+        conn.send_bytes(reply)
+
+class _Worker:
+    __slots__ = ('process', 'conn', 'calls')
+
+    def __init__(self, process, conn: Connection):
+        self.process = process
+        self.conn = conn
+        self.calls = 0
+
+class SandboxPool:
+    """
+    Pre-started worker processes for untrusted commands.
+    Each worker runs one command at a time under rlimits (address space,
+    and CPU seconds per call) and talks to the bot over a pipe with
+    marshal-encoded tuples, so commands only get args and a plain
+    EventSnapshot. Workers are replaced after `max_calls` calls, when their
+    peak RSS passes `max_rss_mb`, when they die and when a call is cancelled
+    (e.g. by the scheduler's timeout).
+    """
+
+    def __init__(self, size: int = 2, paths: Optional[List[str]] = None, cpu_seconds: int = 5,
+                 memory_mb: int = 512, max_calls: int = 100, max_rss_mb: int = 200):
+        self.size = size
+        self.paths = [os.path.abspath(path) for path in (paths or [])]
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_calls = max_calls
+        self.max_rss_mb = max_rss_mb
+        self.recycled = 0
+        # Spawned, not forked: the bot has threads (logging, executors) that fork would copy mid-state
+        self._context = multiprocessing.get_context('spawn')
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[_Worker] = []
+        # Calls waiting for a worker's reply, woken by shutdown()
+        self._waiting: Set[asyncio.Future] = set()
+
+    def start(self):
+        """Start the workers ahead of the first call."""
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        for _ in range(self.size):
+            self._idle.put_nowait(self._spawn())
+        logger.info("Started {} sandbox workers", self.size)
+
+    def _spawn(self) -> _Worker:
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.paths, self.cpu_seconds, self.max_calls, self.memory_mb * 1024 * 1024),
+            name='sandbox',
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+        worker = _Worker(process, parent_conn)
+        self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker: _Worker, kill: bool = False):
+        if worker in self._workers:
+            self._workers.remove(worker)
+        # Closing the pipe ends an idle worker; exited workers are reaped by the next start()
+        worker.conn.close()
+        if kill and worker.process.is_alive():
+            worker.process.kill()
+        self.recycled += 1
+        # After shutdown() there is no pool to refill
+        if self._idle is not None:
+            self._idle.put_nowait(self._spawn())
+
+    async def run(self, module_name: str, digest: Optional[str], snapshot, args: List[str],
+                  lang: Optional[str] = None) -> Any:
+        """Run a command in a worker and return its result."""
+        if self._idle is None:
+            self.start()
+        worker = await self._idle.get()
+        loop = asyncio.get_running_loop()
+        fd = worker.conn.fileno()
+        readable = loop.create_future()
+        try:
+            worker.conn.send_bytes(marshal.dumps((module_name, digest, list(args), snapshot.as_dict(), lang)))
+            loop.add_reader(fd, lambda: readable.done() or readable.set_result(None))
+            self._waiting.add(readable)
+            try:
+                await readable
+            finally:
+                self._waiting.discard(readable)
+                loop.remove_reader(fd)
+            ok, value, max_rss_kb = marshal.loads(worker.conn.recv_bytes())
+        except asyncio.CancelledError:
+            # The command is still running, the worker cannot be reused
+            self._retire(worker, kill=True)
+            raise
+        except (EOFError, OSError, ValueError):
+            # Wait for the exit code off the loop, every other chat keeps running
+            await loop.run_in_executor(None, worker.process.join, 0.5)
+            code = worker.process.exitcode
+            self._retire(worker, kill=True)
+            if code == -signal.SIGXCPU:
+                raise SandboxError(f"{module_name}: CPU limit of {self.cpu_seconds}s exceeded")
+            raise SandboxError(f"{module_name}: sandbox worker died (exit code {code})")
+
+        worker.calls += 1
+        if worker.calls >= self.max_calls or max_rss_kb > self.max_rss_mb * 1024:
+            logger.debug("Recycling sandbox worker after {} calls, peak RSS {}MB", worker.calls, max_rss_kb // 1024)
+            self._retire(worker)
+        elif self._idle is not None:
+            self._idle.put_nowait(worker)
+        else:
+            self._retire(worker)
+
+        if not ok:
+            raise SandboxError(f"{module_name}: {value}")
+        return value
+
+    def shutdown(self):
+        """Stop all workers."""
+        for worker in list(self._workers):
+            worker.conn.close()
+            if worker.process.is_alive():
+                worker.process.kill()
+        self._workers = []
+        self._idle = None
+        # A closed pipe never becomes readable, the reads below fail instead
+        for readable in self._waiting:
+            if not readable.done():
+                readable.set_result(None)
@@ -0,0 +1,142 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Optional
+from loguru import logger
+
+async def run_with_timeout(awaitable: Awaitable[Any], timeout: Optional[float]) -> Any:
+    """
+    Await with a timeout (falsy for none). asyncio.timeout (3.11+) cancels
+    the current task instead of wrapping the awaitable in a new one like
+    wait_for, so a command that does not block finishes in a single step.
+    """
+    if not timeout:
+        return await awaitable
+    if not hasattr(asyncio, 'timeout'):
+        return await asyncio.wait_for(awaitable, timeout)
+    async with asyncio.timeout(timeout):
+        return await awaitable
+
+class _Job:
+    __slots__ = ('name', 'factory', 'enqueued_at')
+
+    def __init__(self, name: str, factory: Callable[[], Awaitable[Any]]):
+        self.name = name
+        self.factory = factory
+        self.enqueued_at = time.monotonic()
+
+class _Lane:
+    __slots__ = ('jobs', 'worker')
+
+    def __init__(self):
+        self.jobs: Deque[_Job] = deque()
+        self.worker: Optional[asyncio.Task] = None
+
+class SchedulerStats:
+    """Counters and wait-time statistics of a CommandScheduler."""
+
+    def __init__(self):
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.running = 0
+        self.max_depth = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    @property
+    def wait_avg(self) -> float:
+        """Mean time jobs waited in their lane before starting."""
+        return self.wait_total / self.started if self.started else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'submitted': self.submitted,
+            'started': self.started,
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'running': self.running,
+            'max_depth': self.max_depth,
+            'wait_avg': self.wait_avg,
+            'wait_max': self.wait_max,
+        }
+
+class CommandScheduler:
+    """
+    Runs command invocations in one FIFO lane per chat.
+    Commands within a chat run strictly in order, at most `concurrency`
+    commands run at once across all chats, and lanes are bounded so bursts
+    are rejected instead of piling up tasks. Jobs time themselves out (see
+    run_with_timeout). Lane workers exit as soon as their lane is empty.
+    """
+
+    def __init__(self, concurrency: int = 8, max_lane_depth: int = 20):
+        self.concurrency = concurrency
+        self.max_lane_depth = max_lane_depth
+        self.stats = SchedulerStats()
+        self._lanes: Dict[Hashable, _Lane] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._depth = 0
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting to start across all lanes."""
+        return self._depth
+
+    def submit(self, key: Hashable, name: str, factory: Callable[[], Awaitable[Any]]) -> bool:
+        """
+        Queue `factory()` on the lane for `key`.
+        Returns False if the lane is full and the job was rejected.
+        """
+        lane = self._lanes.get(key)
+        if lane is None:
+            lane = self._lanes[key] = _Lane()
+        if len(lane.jobs) >= self.max_lane_depth:
+            self.stats.rejected += 1
+            logger.warning("Lane {} is full ({} queued), rejecting {}", key, self.max_lane_depth, name)
+            return False
+
+        lane.jobs.append(_Job(name, factory))
+        self.stats.submitted += 1
+        self._depth += 1
+        if self._depth > self.stats.max_depth:
+            self.stats.max_depth = self._depth
+
+        if lane.worker is None:
+            lane.worker = asyncio.get_running_loop().create_task(self._drain(key, lane))
+        return True
+
+    async def _drain(self, key: Hashable, lane: _Lane):
+        try:
+            while lane.jobs:
+                job = lane.jobs[0]
+                async with self._semaphore:
+                    lane.jobs.popleft()
+                    self._depth -= 1
+                    await self._run(job)
+        finally:
+            lane.worker = None
+            if self._lanes.get(key) is lane and not lane.jobs:
+                del self._lanes[key]
+
+    async def _run(self, job: _Job):
+        waited = time.monotonic() - job.enqueued_at
+        self.stats.started += 1
+        self.stats.wait_total += waited
+        if waited > self.stats.wait_max:
+            self.stats.wait_max = waited
+
+        self.stats.running += 1
+        try:
+            await job.factory()
+            self.stats.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.stats.failed += 1
+            logger.error("Unhandled error in command {}: {}", job.name, e)
+        finally:
+            self.stats.running -= 1
@@ -0,0 +1,100 @@
+import re
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Dict, List, Optional, Set
+
+_WORD_RE = re.compile(r'\w+')
+
+# Queries up to this length also match names one edit away
+SHORT_QUERY = 5
+
+def trigrams(text: str) -> Set[str]:
+    """Character trigrams of a word, padded so short words still match."""
+    padded = f"  {text.lower()} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """
+    Optimal string alignment distance (adjacent swaps count as one edit).
+    Gives up early and returns `limit + 1` once the distance exceeds `limit`.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous, current = None, list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        before, previous, current = previous, current, [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], before[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+    return current[-1]
+
+class SuggestionIndex:
+    """
+    Trigram index over command names and aliases for "did you mean" hints.
+    Lookups only score names that share at least one trigram with the
+    query, so cost depends on the query, not on the number of commands.
+    """
+
+    def __init__(self, min_score: float = 0.3, limit: int = 3):
+        self.min_score = min_score
+        self.limit = limit
+        self._names: Dict[str, str] = {}
+        self._grams: Dict[str, Set[str]] = {}
+        self._postings: Dict[str, Set[str]] = {}
+        self._words: Dict[str, Set[str]] = {}
+
+    def rebuild(self, names: Dict[str, str], descriptions: Optional[Dict[str, str]] = None):
+        """
+        Index routable names (name or alias -> command) and, optionally,
+        command descriptions (command -> text) for keyword matches.
+        """
+        grams_by_name = {}
+        postings = defaultdict(set)
+        for name in names:
+            grams = grams_by_name[name] = trigrams(name)
+            for gram in grams:
+                postings[gram].add(name)
+
+        words = defaultdict(set)
+        for command_name, description in (descriptions or {}).items():
+            for word in _WORD_RE.findall((description or '').lower()):
+                if len(word) > 2:
+                    words[word].add(command_name)
+
+        self._names = dict(names)
+        self._grams = grams_by_name
+        self._postings = dict(postings)
+        self._words = dict(words)
+
+    def suggest(self, query: str, search_descriptions: bool = False) -> List[str]:
+        """Get up to `limit` command names that look like `query`, best first."""
+        query = query.lower()
+        query_grams = trigrams(query)
+
+        postings = self._postings
+        shared = Counter(chain.from_iterable(postings.get(gram, ()) for gram in query_grams))
+
+        # Dice coefficient over trigram sets, best alias per command wins.
+        # Typos in short names like "hlep" share too few trigrams to score,
+        # so those fall back to an edit distance check on the same candidates.
+        check_edits = len(query) <= SHORT_QUERY
+        scores: Dict[str, float] = {}
+        for name, count in shared.items():
+            score = 2 * count / (len(query_grams) + len(self._grams[name]))
+            if score < self.min_score and check_edits and edit_distance(query, name, 1) <= 1:
+                score = self.min_score
+            command_name = self._names[name]
+            if score >= self.min_score and score > scores.get(command_name, 0.0):
+                scores[command_name] = score
+
+        if search_descriptions:
+            for command_name in self._words.get(query, ()):
+                # A keyword hit ranks below any close spelling match
+                scores.setdefault(command_name, self.min_score / 2)
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [command_name for command_name, _ in ranked[:self.limit]]
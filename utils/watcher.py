@@ -0,0 +1,111 @@
+import asyncio
+import ctypes
+import ctypes.util
+import os
+from typing import Callable, Optional
+from loguru import logger
+
+# inotify event masks (see inotify(7))
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+class _Inotify:
+    """Minimal ctypes binding around a single inotify directory watch."""
+
+    def __init__(self, path: str):
+        libc_name = ctypes.util.find_library('c')
+        if not libc_name:
+            raise OSError("libc not found")
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError("inotify is not available on this platform")
+
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        wd = libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {path}")
+
+    def drain(self):
+        """Discard all pending events; callers re-scan the directory instead."""
+        try:
+            while os.read(self.fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def close(self):
+        os.close(self.fd)
+
+class DirectoryWatcher:
+    """
+    Calls `on_change` whenever files in a directory change.
+    Uses inotify when available and falls back to periodic polling;
+    `on_change` is expected to work out what changed by itself.
+    """
+
+    def __init__(self, path: str, on_change: Callable[[], None],
+                 poll_interval: float = 2.0, debounce: float = 0.25):
+        self.path = path
+        self.on_change = on_change
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.mode: Optional[str] = None
+        self._inotify: Optional[_Inotify] = None
+        self._poll_task: Optional[asyncio.Task] = None
+        self._pending: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Start watching on the given (or running) event loop."""
+        self._loop = loop or asyncio.get_running_loop()
+        try:
+            self._inotify = _Inotify(self.path)
+            self._loop.add_reader(self._inotify.fd, self._on_inotify)
+            self.mode = 'inotify'
+        except (OSError, NotImplementedError) as e:
+            logger.info("inotify unavailable ({}), polling {} every {}s", e, self.path, self.poll_interval)
+            self._inotify = None
+            self._poll_task = self._loop.create_task(self._poll())
+            self.mode = 'poll'
+        logger.info("Watching {} for changes ({})", self.path, self.mode)
+
+    def stop(self):
+        """Stop watching and release resources."""
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+        if self._inotify is not None:
+            self._loop.remove_reader(self._inotify.fd)
+            self._inotify.close()
+            self._inotify = None
+        if self._poll_task is not None:
+            self._poll_task.cancel()
+            self._poll_task = None
+
+    def _on_inotify(self):
+        self._inotify.drain()
+        # Editors and downloads emit bursts of events, coalesce them
+        if self._pending is not None:
+            self._pending.cancel()
+        self._pending = self._loop.call_later(self.debounce, self._fire)
+
+    def _fire(self):
+        self._pending = None
+        try:
+            self.on_change()
+        except Exception as e:
+            logger.error("Error handling change in {}: {}", self.path, e)
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            self._fire()
@@ -8,6 +8,7 @@ from loguru import logger
 import os
 from dotenv import load_dotenv
 from pathlib import Path
+from .migrations import run_migrations
 
 # Load environment variables from the correct path
 env_path = Path(__file__).parent.parent / '.env'
@@ -16,6 +17,18 @@ load_dotenv(env_path)
 # Initialize MongoDB
 mongo = PyMongo()
 
+def mongo_client_options():
+    """Connection pool and timeout settings for the shared MongoClient"""
+    return {
+        'maxPoolSize': int(os.getenv('MONGO_MAX_POOL_SIZE', 50)),
+        'minPoolSize': int(os.getenv('MONGO_MIN_POOL_SIZE', 0)),
+        'maxIdleTimeMS': int(os.getenv('MONGO_MAX_IDLE_TIME_MS', 300000)),
+        'waitQueueTimeoutMS': int(os.getenv('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000)),
+        'connectTimeoutMS': int(os.getenv('MONGO_CONNECT_TIMEOUT_MS', 5000)),
+        'serverSelectionTimeoutMS': int(os.getenv('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000)),
+        'socketTimeoutMS': int(os.getenv('MONGO_SOCKET_TIMEOUT_MS', 30000)),
+    }
+
 def create_app():
     """Create and configure Flask application"""
     app = Flask(__name__)
@@ -31,11 +44,14 @@ def create_app():
     app.config['MONGO_URI'] = mongodb_uri
     app.config['DEBUG'] = os.getenv('DEBUG', 'False').lower() == 'true'
     
-    logger.info(f"Connecting to MongoDB at: {mongodb_uri}")
+    logger.info("Connecting to MongoDB at: {}", mongodb_uri)
     
-    # Initialize MongoDB with app
+    # Initialize MongoDB with app; this client and its pool are shared by all models
     try:
-        mongo.init_app(app)
+        mongo.init_app(app, **mongo_client_options())
+        if mongo.db is None:
+            # No database in the URI, fall back to MONGO_DB_NAME
+            mongo.db = mongo.cx[os.getenv('MONGO_DB_NAME', 'userbot')]
         # Test the connection
         mongo.db.command('ping')
         logger.info("Successfully connected to MongoDB!")
@@ -45,21 +61,13 @@ def create_app():
             logger.error("MongoDB instance is None after initialization.")
         else:
             logger.info("MongoDB instance is valid.")
-        
-        # Check if the 'users' collection exists, if not create it
-        if 'users' not in mongo.db.list_collection_names():
-            mongo.db.create_collection('users')
-            logger.info("'users' collection created in MongoDB.")
     except Exception as e:
-        logger.error(f"Failed to connect to MongoDB: {str(e)}")
+        logger.error("Failed to connect to MongoDB: {}", e)
         raise
     
-    # Log the available collections to verify access
-    try:
-        collections = mongo.db.list_collection_names()
-        logger.info(f"Available collections in MongoDB: {collections}")
-    except Exception as e:
-        logger.error(f"Error accessing collections: {str(e)}")
+    # Create indexes once per schema version; collections are created with them
+    schema_version = run_migrations(mongo.db)
+    logger.info("MongoDB schema version: {}", schema_version)
     
     # Initialize LoginManager
     login_manager = LoginManager()
@@ -67,13 +75,16 @@ def create_app():
     login_manager.login_view = 'auth.login'
     
     # Import models after mongo is initialized
-    from .models.user import User
+    from .models.user import User, users
     
     @login_manager.user_loader
     def load_user(user_id):
-        """Load user by telegram_id for Flask-Login"""
-        user_data = mongo.db.users.find_one({'telegram_id': str(user_id)})
-        return User(user_data) if user_data else None
+        """Load user by telegram_id for Flask-Login, cached for USER_CACHE_TTL seconds"""
+        user_data = users.find_cached(user_id)
+        # Deactivated users lose their sessions
+        if not user_data or not user_data.get('is_active', True):
+            return None
+        return User(user_data)
         
     @login_manager.unauthorized_handler
     def unauthorized():
@@ -95,7 +106,7 @@ def create_app():
         from .services.auth import AuthService
         auth_service = AuthService(mongo.db)
         auth_service.get_or_create_user(admin_id, username="admin")
-        logger.info(f"Default admin user created/verified with ID: {admin_id}")
+        logger.info("Default admin user created/verified with ID: {}", admin_id)
     
     @app.route('/')
     def index():
@@ -110,7 +121,7 @@ def create_app():
     @app.errorhandler(500)
     def internal_error(error):
         """Handle 500 errors"""
-        logger.error(f"Internal server error: {str(error)}")
+        logger.error("Internal server error: {}", error)
         return jsonify({'error': 'Internal server error'}), 500
     
     return app
@@ -0,0 +1,68 @@
+"""
+Schema migrations for the MongoDB collections
+"""
+from datetime import datetime
+from loguru import logger
+from pymongo import ASCENDING
+from pymongo.errors import PyMongoError
+
+# Id of the document in the migrations collection that records the schema version
+SCHEMA_ID = 'schema'
+
+# Users created by !account_creator have no telegram_id, leave them out of the unique index
+TELEGRAM_ID_FILTER = {'telegram_id': {'$exists': True}}
+
+def create_telegram_id_index(db):
+    db.users.create_index(
+        [('telegram_id', ASCENDING)], unique=True, name='telegram_id_unique',
+        partialFilterExpression=TELEGRAM_ID_FILTER
+    )
+
+def create_lookup_indexes(db):
+    """Index the fields the auth and command routes look up by"""
+    create_telegram_id_index(db)
+    db.commands.create_index([('name', ASCENDING)], unique=True, name='name_unique')
+    db.commands.create_index([('created_by', ASCENDING)], name='created_by')
+
+def make_telegram_id_index_partial(db):
+    """Rebuild a telegram_id index created before it was partial"""
+    index = db.users.index_information().get('telegram_id_unique')
+    if index is not None and 'partialFilterExpression' not in index:
+        db.users.drop_index('telegram_id_unique')
+    create_telegram_id_index(db)
+
+# (version, description, function), in the order they are applied
+MIGRATIONS = [
+    (1, "lookup indexes on users and commands", create_lookup_indexes),
+    (2, "partial unique index on users.telegram_id", make_telegram_id_index_partial),
+]
+
+def run_migrations(db):
+    """
+    Apply the migrations newer than the version recorded in the database
+
+    Args:
+        db: MongoDB database instance
+
+    Returns:
+        int: Schema version after the run
+    """
+    record = db.migrations.find_one({'_id': SCHEMA_ID}) or {}
+    version = record.get('version', 0)
+    for target, description, migrate in MIGRATIONS:
+        if target <= version:
+            continue
+        logger.info("Applying migration {}: {}", target, description)
+        try:
+            migrate(db)
+        except PyMongoError as e:
+            # Not recorded, so it is retried on the next start
+            logger.error("Migration {} failed: {}", target, e)
+            break
+        db.migrations.update_one(
+            {'_id': SCHEMA_ID},
+            {'$max': {'version': target}, '$set': {'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+        version = target
+    return version
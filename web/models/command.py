@@ -2,6 +2,34 @@
 Command model for the web interface
 """
 from datetime import datetime
+from pymongo import ReturnDocument
+
+# Fields a command document is serialized with; LIST_FIELDS leaves out the code
+FIELDS = ('name', 'description', 'code', 'created_by', 'is_active', 'created_at')
+LIST_FIELDS = tuple(field for field in FIELDS if field != 'code')
+
+def commands_version(db):
+    """
+    Get the version counter of the commands collection
+    
+    Args:
+        db: MongoDB database instance
+        
+    Returns:
+        int: Number of writes recorded so far
+    """
+    counter = db.counters.find_one({'_id': 'commands'})
+    return counter['version'] if counter else 0
+
+def bump_commands_version(db):
+    """Record a write to the commands collection; returns the new version"""
+    counter = db.counters.find_one_and_update(
+        {'_id': 'commands'},
+        {'$inc': {'version': 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter['version']
 
 class Command:
     """Command model that represents a bot command"""
@@ -34,9 +62,9 @@ class Command:
     def created_at(self):
         return self.command_data.get('created_at')
         
-    def to_dict(self):
-        """Convert command to dictionary"""
-        return {
+    def to_dict(self, fields=FIELDS):
+        """Convert command to dictionary, limited to `fields`"""
+        data = {
             'name': self.name,
             'description': self.description,
             'code': self.code,
@@ -44,3 +72,4 @@ class Command:
             'is_active': self.is_active,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+        return {field: data[field] for field in fields}
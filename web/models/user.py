@@ -3,13 +3,98 @@ User model for the web interface using MongoDB
 """
 from flask_login import UserMixin
 from werkzeug.security import generate_password_hash, check_password_hash
+from collections import OrderedDict
 from datetime import datetime
-from pymongo import MongoClient
+from threading import Lock
 import os
+import time
+from ..app import mongo
 
-# MongoDB connection
-MONGO_URI = os.getenv('MONGO_URI', 'mongodb://localhost:27017/')
-DB_NAME = os.getenv('MONGO_DB_NAME', 'userbot')
+class UserCache:
+    """
+    Per-process cache of user documents for the Flask-Login user_loader.
+    Entries expire after `ttl` seconds, the least recently used ones are
+    dropped beyond `maxsize`, and writes to a user invalidate it explicitly.
+    Writes from other processes (e.g. the bot) show up within `ttl`.
+    """
+
+    def __init__(self, ttl=30.0, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, telegram_id):
+        """Get a cached user document, or None if missing or expired"""
+        key = str(telegram_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, telegram_id, user_data):
+        """Cache a user document"""
+        key = str(telegram_id)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, user_data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id):
+        """Drop a user from the cache"""
+        with self._lock:
+            self._entries.pop(str(telegram_id), None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+user_cache = UserCache(
+    ttl=float(os.getenv('USER_CACHE_TTL', 30)),
+    maxsize=int(os.getenv('USER_CACHE_SIZE', 1024))
+)
+
+class UserRepository:
+    """
+    Data access for the users collection.
+    Goes through the client owned by web.app.mongo, so every call borrows a
+    pooled connection instead of connecting to MongoDB again.
+    """
+
+    @property
+    def collection(self):
+        return mongo.db.users
+
+    def find_by_telegram_id(self, telegram_id):
+        """Get a user document by Telegram ID"""
+        return self.collection.find_one({'telegram_id': str(telegram_id)})
+
+    def find_cached(self, telegram_id):
+        """Get a user document by Telegram ID, from the user cache when possible"""
+        user_data = user_cache.get(telegram_id)
+        if user_data is None:
+            user_data = self.find_by_telegram_id(telegram_id)
+            if user_data is not None:
+                user_cache.put(telegram_id, user_data)
+        return user_data
+
+    def update(self, telegram_id, fields):
+        """Set fields on a user document"""
+        result = self.collection.update_one({'telegram_id': str(telegram_id)}, {'$set': fields})
+        user_cache.invalidate(telegram_id)
+        return result
+
+    def insert(self, user_data):
+        """Insert a new user document"""
+        return self.collection.insert_one(user_data)
+
+users = UserRepository()
 
 class User(UserMixin):
     """User model that handles user authentication and management"""
@@ -51,41 +136,19 @@ class User(UserMixin):
         
     def update_last_login(self):
         """Update last login timestamp"""
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
-        users = db.users
-        
-        users.update_one(
-            {'telegram_id': self.telegram_id},
-            {'$set': {'last_login': datetime.utcnow()}}
-        )
-        client.close()
+        users.update(self.telegram_id, {'last_login': datetime.utcnow()})
 
     @staticmethod
     def get_by_telegram_id(telegram_id):
         """Get user by Telegram ID"""
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
-        users = db.users
-        
-        user_data = users.find_one({'telegram_id': str(telegram_id)})
-        client.close()
-        
+        user_data = users.find_by_telegram_id(telegram_id)
         if user_data:
             return User(user_data)
         return None
 
     def set_password(self, password):
         """Set new password"""
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
-        users = db.users
-        
-        users.update_one(
-            {'telegram_id': self.telegram_id},
-            {'$set': {'password': generate_password_hash(password)}}
-        )
-        client.close()
+        users.update(self.telegram_id, {'password': generate_password_hash(password)})
         
     def to_dict(self):
         """Convert user to dictionary"""
@@ -111,10 +174,6 @@ class User(UserMixin):
         Returns:
             User: New user instance
         """
-        client = MongoClient(MONGO_URI)
-        db = client[DB_NAME]
-        users = db.users
-        
         user_data = {
             'telegram_id': str(telegram_id),
             'username': username or f"user_{telegram_id}",
@@ -123,7 +182,5 @@ class User(UserMixin):
             'created_at': datetime.utcnow()
         }
         
-        users.insert_one(user_data)
-        client.close()
-        
+        users.insert(user_data)
         return User(user_data)
@@ -3,6 +3,7 @@ Authentication routes for the web interface
 """
 from flask import Blueprint, request, jsonify, render_template, redirect, url_for, flash
 from flask_login import login_user, logout_user, login_required, current_user
+from ..models.user import user_cache
 from ..services.auth import AuthService
 from ..app import mongo
 from loguru import logger
@@ -35,7 +36,7 @@ def login():
             return redirect(url_for('dashboard'))
             
         except Exception as e:
-            logger.error(f"Login error: {str(e)}")
+            logger.error("Login error: {}", e)
             flash('Bir hata oluştu. Lütfen tekrar deneyin.', 'error')
             return redirect(url_for('index'))
     
@@ -46,10 +47,11 @@ def login():
 def logout():
     """Handle user logout"""
     try:
+        user_cache.invalidate(current_user.telegram_id)
         logout_user()
         flash('Başarıyla çıkış yapıldı.', 'success')
     except Exception as e:
-        logger.error(f"Logout error: {str(e)}")
+        logger.error("Logout error: {}", e)
         flash('Çıkış yaparken bir hata oluştu.', 'error')
     
     return redirect(url_for('index'))
@@ -74,7 +76,7 @@ def change_password():
         flash('Şifre başarıyla güncellendi.', 'success')
         
     except Exception as e:
-        logger.error(f"Password change error: {str(e)}")
+        logger.error("Password change error: {}", e)
         flash('Şifre değiştirirken bir hata oluştu.', 'error')
         
     return redirect(url_for('dashboard'))
@@ -1,23 +1,96 @@
 """
 Command routes for the web interface
 """
-from flask import Blueprint, request, jsonify
+import hashlib
+import itertools
+import json
+from datetime import datetime
+from flask import Blueprint, Response, request, jsonify, stream_with_context
 from flask_login import login_required, current_user
 from loguru import logger
 from ..app import mongo
-from ..models.command import Command
+from ..models.command import Command, FIELDS, LIST_FIELDS, bump_commands_version, commands_version
+from ..services.command import CommandService
 
 command_bp = Blueprint('command', __name__)
 
+# Page size of /list
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+# Query parameters that select the paginated response
+PAGE_PARAMS = ('after', 'limit', 'fields')
+
+def _prefetch(cursor):
+    """Run the query now, so database errors become a 500 instead of a cut-off stream"""
+    first = next(cursor, None)
+    return itertools.chain([first] if first is not None else [], cursor)
+
+def _stream_array(cursor, fields):
+    """Yield commands as a JSON array, one command at a time"""
+    yield '['
+    for count, cmd in enumerate(cursor):
+        yield (', ' if count else '') + json.dumps(Command(cmd).to_dict(fields))
+    yield ']'
+
+def _stream_page(cursor, fields, limit):
+    """Yield a page of commands as JSON, one command at a time"""
+    yield '{"commands": ['
+    last_name, count = None, 0
+    for cmd in cursor:
+        yield (', ' if count else '') + json.dumps(Command(cmd).to_dict(fields))
+        last_name, count = cmd['name'], count + 1
+    # A full page may have more after it
+    yield '], "next_cursor": ' + json.dumps(last_name if count == limit else None) + '}'
+
 @command_bp.route('/list', methods=['GET'])
 @login_required
 def list_commands():
-    """List all available commands"""
+    """
+    List commands, ordered by name
+    
+    Without query parameters the response is the full list as a JSON array,
+    as before. With any of them it is a page:
+    {"commands": [...], "next_cursor": <name or null>}
+    
+    Query parameters:
+        after: Cursor from the previous page's next_cursor
+        limit: Page size (default 100, at most 500)
+        fields: Comma-separated fields to return (default: all but code)
+    """
     try:
-        commands = mongo.db.commands.find()
-        return jsonify([Command(cmd).to_dict() for cmd in commands])
+        paginated = any(param in request.args for param in PAGE_PARAMS)
+        after = request.args.get('after')
+        limit = min(max(request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), 1), MAX_PAGE_SIZE)
+        fields = LIST_FIELDS if paginated else FIELDS
+        if request.args.get('fields'):
+            fields = tuple(field for field in request.args['fields'].split(',') if field in FIELDS)
+            if not fields:
+                return jsonify({'error': f"fields must be a subset of {', '.join(FIELDS)}"}), 400
+
+        # The collection version changes on every write, so unchanged pages revalidate with a 304
+        key = f"{paginated}|{after}|{limit}|{','.join(fields)}".encode('utf-8')
+        etag = f"{commands_version(mongo.db)}-{hashlib.sha1(key).hexdigest()[:16]}"
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+            response.set_etag(etag)
+            return response
+
+        query = {'name': {'$gt': after}} if after else {}
+        # name is always fetched, it is the pagination cursor
+        projection = dict.fromkeys(fields + ('name',), 1)
+        projection['_id'] = 0
+        cursor = mongo.db.commands.find(query, projection).sort('name', 1)
+        if paginated:
+            body = _stream_page(_prefetch(cursor.limit(limit)), fields, limit)
+        else:
+            body = _stream_array(_prefetch(cursor), fields)
+        response = Response(stream_with_context(body), mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
-        logger.error(f"Error listing commands: {str(e)}")
+        logger.error("Error listing commands: {}", e)
         return jsonify({'error': str(e)}), 500
 
 @command_bp.route('/create', methods=['POST'])
@@ -46,17 +119,20 @@ def create_command():
             'description': description,
             'code': code,
             'created_by': current_user.telegram_id,
-            'is_active': True
+            'is_active': True,
+            'created_at': datetime.utcnow(),
+            'updated_at': datetime.utcnow()
         }
         
         result = mongo.db.commands.insert_one(command_data)
         if result.inserted_id:
+            bump_commands_version(mongo.db)
             return jsonify({'message': 'Command created successfully'}), 201
         else:
             return jsonify({'error': 'Failed to create command'}), 500
             
     except Exception as e:
-        logger.error(f"Error creating command: {str(e)}")
+        logger.error("Error creating command: {}", e)
         return jsonify({'error': str(e)}), 500
 
 @command_bp.route('/update/<name>', methods=['PUT'])
@@ -84,6 +160,8 @@ def update_command(name):
             
         if not update_data:
             return jsonify({'error': 'No fields to update'}), 400
+        # Watermark for the bot's command sync
+        update_data['updated_at'] = datetime.utcnow()
             
         result = mongo.db.commands.update_one(
             {'name': name},
@@ -91,12 +169,13 @@ def update_command(name):
         )
         
         if result.modified_count:
+            bump_commands_version(mongo.db)
             return jsonify({'message': 'Command updated successfully'})
         else:
             return jsonify({'error': 'Failed to update command'}), 500
             
     except Exception as e:
-        logger.error(f"Error updating command: {str(e)}")
+        logger.error("Error updating command: {}", e)
         return jsonify({'error': str(e)}), 500
 
 @command_bp.route('/delete/<name>', methods=['DELETE'])
@@ -106,9 +185,53 @@ def delete_command(name):
     try:
         result = mongo.db.commands.delete_one({'name': name})
         if result.deleted_count:
+            bump_commands_version(mongo.db)
             return jsonify({'message': 'Command deleted successfully'})
         else:
             return jsonify({'error': 'Command not found'}), 404
     except Exception as e:
-        logger.error(f"Error deleting command: {str(e)}")
+        logger.error("Error deleting command: {}", e)
         return jsonify({'error': str(e)}), 500
+
+@command_bp.route('/bulk', methods=['POST'])
+@login_required
+def bulk_import():
+    """
+    Apply NDJSON create/update/delete operations, one per line
+    
+    Responds with one NDJSON result per operation, streamed as chunks are written.
+    """
+    service = CommandService(mongo.db)
+    author_id = current_user.telegram_id
+
+    def generate():
+        counts = {}
+        for result in service.apply_bulk(request.stream, author_id):
+            counts[result['status']] = counts.get(result['status'], 0) + 1
+            yield json.dumps(result) + '\n'
+        yield json.dumps({'summary': counts}) + '\n'
+
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@command_bp.route('/bulk', methods=['GET'])
+@login_required
+def bulk_export():
+    """Download every command as NDJSON, in the format /bulk imports"""
+    try:
+        cursor = _prefetch(mongo.db.commands.find({}, dict.fromkeys(FIELDS, 1) | {'_id': 0}).sort('name', 1))
+    except Exception as e:
+        logger.error("Error exporting commands: {}", e)
+        return jsonify({'error': str(e)}), 500
+
+    def generate():
+        try:
+            for cmd in cursor:
+                yield json.dumps(Command(cmd).to_dict()) + '\n'
+        except Exception as e:
+            # Headers are already sent, end the download with an error line
+            logger.error("Error exporting commands: {}", e)
+            yield json.dumps({'error': str(e)}) + '\n'
+
+    response = Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    response.headers['Content-Disposition'] = 'attachment; filename=commands.ndjson'
+    return response
@@ -40,11 +40,11 @@ def main():
         
         # Run the app
         port = int(os.getenv('PORT', 5000))
-        logger.info(f"Starting web interface on port {port}")
+        logger.info("Starting web interface on port {}", port)
         app.run(host='0.0.0.0', port=port, debug=app.config['DEBUG'])
         
     except Exception as e:
-        logger.error(f"Startup error: {str(e)}")
+        logger.error("Startup error: {}", e)
         input("Press Enter to exit...")  # Keep console window open
         sys.exit(1)
 
@@ -4,7 +4,7 @@ Authentication service for the web interface
 from loguru import logger
 from werkzeug.security import generate_password_hash
 from datetime import datetime
-from ..models.user import User
+from ..models.user import User, user_cache
 
 class AuthService:
     """Service class that handles user authentication"""
@@ -31,7 +31,7 @@ class AuthService:
         """
         user_data = self.db.users.find_one({"telegram_id": str(telegram_id)})
         if not user_data:
-            logger.info(f"Creating new user with telegram_id: {telegram_id}")
+            logger.info("Creating new user with telegram_id: {}", telegram_id)
             user_data = {
                 "telegram_id": str(telegram_id),
                 "username": username or f"user_{telegram_id}",
@@ -62,6 +62,7 @@ class AuthService:
                     {"telegram_id": str(telegram_id)},
                     {"$set": {"last_login": datetime.utcnow()}}
                 )
+                user_cache.invalidate(telegram_id)
                 return user
         return None
 
@@ -80,4 +81,22 @@ class AuthService:
             {"telegram_id": str(telegram_id)},
             {"$set": {"password": generate_password_hash(password)}}
         )
+        user_cache.invalidate(telegram_id)
+        return result.modified_count > 0
+
+    def deactivate_user(self, telegram_id):
+        """
+        Deactivate a user, ending their web sessions
+        
+        Args:
+            telegram_id (str): Telegram user ID
+            
+        Returns:
+            bool: True if the user was active, False otherwise
+        """
+        result = self.db.users.update_one(
+            {"telegram_id": str(telegram_id), "is_active": {"$ne": False}},
+            {"$set": {"is_active": False}}
+        )
+        user_cache.invalidate(telegram_id)
         return result.modified_count > 0
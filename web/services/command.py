@@ -1,9 +1,34 @@
 """
 Command service for the web interface
 """
-from ..models.command import Command
+import json
+from datetime import datetime
+from pymongo import DeleteOne, InsertOne, UpdateOne
+from pymongo.errors import BulkWriteError
+from ..models.command import Command, bump_commands_version
 from loguru import logger
 
+# Operations per bulk_write
+BULK_CHUNK_SIZE = 500
+
+# Fields an update operation may change, with their types
+UPDATABLE_FIELDS = {'description': str, 'code': str, 'is_active': bool}
+
+def _check_fields(data):
+    """Raise ValueError for a name or updatable field of the wrong type"""
+    for field, field_type in {'name': str, **UPDATABLE_FIELDS}.items():
+        if field not in data:
+            continue
+        value = data[field]
+        if not isinstance(value, field_type):
+            raise ValueError(f"{field} must be a {'boolean' if field_type is bool else 'string'}")
+        if field_type is str:
+            try:
+                # JSON can carry lone surrogates, BSON cannot
+                value.encode('utf-8')
+            except UnicodeEncodeError:
+                raise ValueError(f"{field} is not valid UTF-8")
+
 class CommandService:
     """Service class for handling command operations"""
     
@@ -39,10 +64,10 @@ class CommandService:
                 category=category,
                 code=code
             )
-            logger.info(f"Created new command: {name} by user {author_id}")
+            logger.info("Created new command: {} by user {}", name, author_id)
             return command
         except Exception as e:
-            logger.error(f"Error creating command: {str(e)}")
+            logger.error("Error creating command: {}", e)
             raise
 
     def get_user_commands(self, user_id):
@@ -57,10 +82,10 @@ class CommandService:
         """
         try:
             commands = Command.get_user_commands(self.db, user_id)
-            logger.debug(f"Retrieved {len(commands)} commands for user {user_id}")
+            logger.debug("Retrieved {} commands for user {}", len(commands), user_id)
             return commands
         except Exception as e:
-            logger.error(f"Error getting user commands: {str(e)}")
+            logger.error("Error getting user commands: {}", e)
             raise
 
     def toggle_command(self, command_id):
@@ -76,14 +101,14 @@ class CommandService:
         try:
             command = Command.get_by_id(self.db, command_id)
             if not command:
-                logger.warning(f"Command not found: {command_id}")
+                logger.warning("Command not found: {}", command_id)
                 return None
                 
             new_state = command.toggle_active(self.db)
-            logger.info(f"Toggled command {command_id} to {new_state}")
+            logger.info("Toggled command {} to {}", command_id, new_state)
             return new_state
         except Exception as e:
-            logger.error(f"Error toggling command: {str(e)}")
+            logger.error("Error toggling command: {}", e)
             raise
 
     def update_command(self, command_id, **updates):
@@ -100,12 +125,130 @@ class CommandService:
         try:
             command = Command.get_by_id(self.db, command_id)
             if not command:
-                logger.warning(f"Command not found: {command_id}")
+                logger.warning("Command not found: {}", command_id)
                 return None
                 
             command.update(self.db, **updates)
-            logger.info(f"Updated command {command_id}")
+            logger.info("Updated command {}", command_id)
             return command
         except Exception as e:
-            logger.error(f"Error updating command: {str(e)}")
+            logger.error("Error updating command: {}", e)
             raise
+
+    def apply_bulk(self, lines, author_id, chunk_size=BULK_CHUNK_SIZE):
+        """
+        Apply NDJSON create/update/delete operations in chunked bulk writes
+        
+        Each line is an object with an `op` ("create" when missing, "update"
+        or "delete"), the command `name` and its fields, so an export can be
+        imported as is.
+        
+        Args:
+            lines (iterable): NDJSON lines (str or bytes)
+            author_id (str): User ID recorded as created_by on new commands
+            chunk_size (int): Operations per bulk_write
+            
+        Yields:
+            dict: One result per non-empty line, in input order
+        """
+        chunk = []
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            chunk.append((number, line))
+            if len(chunk) >= chunk_size:
+                yield from self._apply_chunk(chunk, author_id)
+                chunk = []
+        if chunk:
+            yield from self._apply_chunk(chunk, author_id)
+
+    def _parse(self, line, author_id):
+        """Turn an NDJSON line into (op, name, write) or raise ValueError"""
+        try:
+            data = json.loads(line)
+        except ValueError:
+            raise ValueError("invalid JSON")
+        if not isinstance(data, dict):
+            raise ValueError("expected an object")
+        op = data.get('op', 'create')
+        name = data.get('name')
+        if not name or not isinstance(name, str):
+            raise ValueError("missing name")
+        _check_fields({**data, 'name': name})
+
+        if op == 'create':
+            if not data.get('description') or not data.get('code'):
+                raise ValueError("missing required fields")
+            return op, name, InsertOne({
+                'name': name,
+                'description': data['description'],
+                'code': data['code'],
+                'created_by': author_id,
+                'is_active': data.get('is_active', True),
+                'created_at': datetime.utcnow(),
+                'updated_at': datetime.utcnow()
+            })
+        if op == 'update':
+            update_data = {field: data[field] for field in UPDATABLE_FIELDS if field in data}
+            if not update_data:
+                raise ValueError("no fields to update")
+            update_data['updated_at'] = datetime.utcnow()
+            return op, name, UpdateOne({'name': name}, {'$set': update_data})
+        if op == 'delete':
+            return op, name, DeleteOne({'name': name})
+        raise ValueError(f"unknown op: {op}")
+
+    def _apply_chunk(self, chunk, author_id):
+        results = []
+        planned = []
+        for number, line in chunk:
+            try:
+                op, name, write = self._parse(line, author_id)
+            except ValueError as e:
+                results.append({'line': number, 'status': 'error', 'error': str(e)})
+                continue
+            result = {'line': number, 'op': op, 'name': name}
+            results.append(result)
+            planned.append((result, write))
+
+        # One existence query per chunk instead of a find_one per operation
+        names = list({result['name'] for result, _ in planned})
+        existing = {doc['name'] for doc in self.db.commands.find({'name': {'$in': names}}, {'name': 1, '_id': 0})}
+        writes = []
+        for result, write in planned:
+            name = result['name']
+            if result['op'] == 'create':
+                if name in existing:
+                    result.update(status='error', error='command already exists')
+                    continue
+                existing.add(name)
+            elif name not in existing:
+                result.update(status='error', error='command not found')
+                continue
+            elif result['op'] == 'delete':
+                existing.discard(name)
+            writes.append((result, write))
+
+        applied = self._bulk_write(writes)
+        if applied:
+            bump_commands_version(self.db)
+        logger.info("Bulk command chunk: {} of {} operations applied", applied, len(chunk))
+        return results
+
+    def _bulk_write(self, writes):
+        """Run ordered bulk writes, resuming after a failed operation; returns the number applied"""
+        applied = 0
+        while writes:
+            try:
+                self.db.commands.bulk_write([write for _, write in writes], ordered=True)
+                done, writes = writes, []
+            except BulkWriteError as e:
+                # Ordered: everything before the first error was applied, nothing after it
+                error = e.details['writeErrors'][0]
+                index = error['index']
+                done, failed, writes = writes[:index], writes[index], writes[index + 1:]
+                failed[0].update(status='error', error=error.get('errmsg', 'write failed'))
+            for result, _ in done:
+                result['status'] = {'create': 'created', 'update': 'updated', 'delete': 'deleted'}[result['op']]
+            applied += len(done)
+        return applied